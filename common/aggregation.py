@@ -0,0 +1,87 @@
+import heapq
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from common.streaming_experiment import TestResult
+
+"""
+ Folds results into reports as tests finish instead of sorting every result at the end. The fastest tests are
+ kept in a bounded heap per report size and the winner, the fastest test with the smallest area on a tie, is
+ updated with each result, so reports can be written at any point of a run. With a directory and every set,
+ the reports are rewritten there after every that many results.
+"""
+class ResultAggregator:
+    def __init__(self, area: Callable[[Dict[str, int]], int], top: Iterable[int] = (5, 10),
+                 include: Optional[Callable[[TestResult], bool]] = None, directory: Optional[str] = None,
+                 every: int = 0):
+        self.area = area
+        self.include = include
+        self.directory = directory
+        self.every = every
+        # Max heaps of (-time, -order, name), so the slowest of the kept tests is the one pushed out
+        self.top = {k: [] for k in top}
+        self.winner = None
+        self.times = {}
+        self.pruned = {}
+        self.tests = {}
+        self.count = 0
+
+    def add(self, result: TestResult) -> None:
+        if self.include is not None and not self.include(result):
+            return
+        self._add(result)
+        if self.directory is not None and self.every and len(self.tests) % self.every == 0:
+            self.write(self.directory)
+
+    def _add(self, result: TestResult) -> None:
+        area = self.area(result.point)
+        self.tests[result.name] = {"status": result.status, "time": result.time, "area": area, "point": result.point}
+        if result.status == "pruned":
+            # Pruned tests were cut off once they could no longer win, their time is how far they got
+            self.pruned[result.name] = result.time
+            return
+
+        self.count += 1
+        self.times[result.name] = result.time
+        entry = (-result.time, -self.count, result.name)
+        for k, heap in self.top.items():
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+        if self.winner is None or (result.time, area) < (self.winner["clocks"], self.winner["area"]):
+            self.winner = {"name": result.name, "clocks": result.time, "area": area}
+
+    def fastest(self, k: int) -> Dict[str, int]:
+        return {name: -time for time, _, name in sorted(self.top[k], reverse=True)}
+
+    def ranked(self) -> Dict[str, int]:
+        return dict(sorted(self.times.items(), key=lambda item: item[1]))
+
+    # The names of the completed tests and a row per test of the given objectives, each one "time", "area" or a
+    # parameter of the tests' points
+    def objectives(self, labels: List[str]) -> Tuple[List[str], np.ndarray]:
+        names = [name for name, test in self.tests.items() if test["status"] == "completed"]
+        rows = np.empty((len(names), len(labels)), dtype=np.int64)
+        for i, name in enumerate(names):
+            test = self.tests[name]
+            rows[i] = [test[label] if label in ("time", "area") else test["point"][label] for label in labels]
+        return names, rows
+
+    def write(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        reports = {"pruned.json": self.pruned, "all.json": self.ranked(), "tests.json": self.tests,
+                   "winner.json": self.winner or {"name": "", "clocks": 0, "area": 0}}
+        for k in self.top:
+            reports["top_{}.json".format(k)] = self.fastest(k)
+
+        for file, report in reports.items():
+            # Write next to the report and swap it in, so a report read during a run is never half written
+            path = os.path.join(directory, file)
+            with open(path + ".tmp", 'w') as f:
+                json.dump(report, f)
+            os.replace(path + ".tmp", path)
@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+from multiprocessing import Pool
+from typing import Callable, Dict, List, Optional, Tuple
+
+from hestia.container import Container
+
+from common.clocking import run_until_idle
+from common.equivalence import Variant
+from common.model_pool import create_model
+from common.timing import PhaseTimer
+
+# Bumped whenever the layout of a benchmark report changes, so old baselines are not compared by mistake
+FORMAT = 1
+# The phases of a benchmark, in the order they run. construct is building the Python container, build is
+# handing it to the model.
+BENCHMARK_PHASES = ["model", "construct", "build", "validate", "setup", "clock", "tear_down"]
+
+
+"""
+ One test bench on one workload. workload holds the values it was scaled with, such as the number of loop
+ iterations or the memory size, and is written to the report next to the timings.
+"""
+class BenchmarkCase(Variant):
+    def __init__(self, name: str, create_test: Callable[[], Container], clock_domains: Dict[str, int],
+                 memories: Optional[Dict[str, Dict[str, int]]] = None, workload: Optional[Dict] = None):
+        super(BenchmarkCase, self).__init__(name, create_test, clock_domains, memories)
+        self.workload = workload if workload is not None else {}
+
+
+# Runs the case once on a fresh model and returns the cycles it was clocked for and the time of every phase
+def _measure_once(path: str, case: BenchmarkCase, check_interval: int) -> Tuple[int, Dict[str, Dict[str, float]]]:
+    timer = PhaseTimer()
+    with timer.phase("model"):
+        model = create_model(path, case.clock_domains, case.memories)
+    with timer.phase("construct"):
+        test = case.create_test()
+    with timer.phase("build"):
+        test.build(model)
+    with timer.phase("validate"):
+        if not model.validate():
+            raise RuntimeError("Benchmark {} is not in a valid state".format(case.name))
+    with timer.phase("setup"):
+        model.setup()
+    with timer.phase("clock"):
+        clocked = run_until_idle(model, None, check_interval)
+    with timer.phase("tear_down"):
+        model.tear_down()
+    return clocked.cycles, timer.phases
+
+
+# Each case runs in a process of its own, so nothing one bench leaves behind in the model library slows down
+# the next. The first run only warms up the library and is not counted.
+def _run_case(args: Tuple[str, BenchmarkCase, int, int]) -> Dict:
+    path, case, repeats, check_interval = args
+    _measure_once(path, case, check_interval)
+    runs = [_measure_once(path, case, check_interval) for _ in range(repeats)]
+
+    cycles = runs[0][0]
+    if any(run_cycles != cycles for run_cycles, _ in runs):
+        raise RuntimeError("Benchmark {} ran for a different number of cycles each time".format(case.name))
+
+    phases = {}
+    for phase in BENCHMARK_PHASES:
+        walls = [run_phases[phase]["wall"] for _, run_phases in runs]
+        cpus = [run_phases[phase]["cpu"] for _, run_phases in runs]
+        phases[phase] = {"median": statistics.median(walls), "min": min(walls), "cpu": statistics.median(cpus)}
+    clock = phases["clock"]["median"]
+    return {"workload": case.workload, "cycles": cycles, "cycles_per_second": cycles / clock if clock > 0 else 0.0,
+            "phases": phases}
+
+
+# check_interval is passed on to run_until_idle. More than one cycle per call is quicker to clock, but only
+# simulates the same cycles when the model library stops clocking once idle, see tests/test_clocking.py, so
+# reports are only compared with baselines taken at the same interval.
+def run_benchmarks(path: str, cases: List[BenchmarkCase], repeats: int = 5, check_interval: int = 1) -> Dict:
+    # One case at a time, benchmarks running side by side would only measure each other
+    with Pool(1, maxtasksperchild=1) as p:
+        results = p.map(_run_case, [(path, case, repeats, check_interval) for case in cases], chunksize=1)
+    return {"format": FORMAT, "model": os.path.basename(path), "host": platform.node(),
+            "python": platform.python_version(), "repeats": repeats, "check_interval": check_interval,
+            "benchmarks": {case.name: result for case, result in zip(cases, results)}}
+
+
+# Sorted keys and a fixed layout, so reports of two runs diff line by line
+def write_report(path: str, report: Dict) -> None:
+    with open(path + ".tmp", 'w') as f:
+        json.dump(report, f, indent=1, sort_keys=True)
+        f.write("\n")
+    os.replace(path + ".tmp", path)
+
+
+def load_report(path: str) -> Dict:
+    with open(path, 'r') as f:
+        report = json.load(f)
+    if report.get("format") != FORMAT:
+        raise ValueError("{} is a benchmark report of format {}, expected {}".format(path, report.get("format"), FORMAT))
+    return report
+
+
+"""
+ A measurement that got worse than its baseline by more than the threshold
+"""
+class Regression:
+    def __init__(self, benchmark: str, measure: str, baseline: float, current: float):
+        self.benchmark = benchmark
+        self.measure = measure
+        self.baseline = baseline
+        self.current = current
+
+    def __str__(self) -> str:
+        return "{} {}: {:.6g} -> {:.6g} ({:+.1f}%)".format(self.benchmark, self.measure, self.baseline, self.current,
+                                                          100.0 * (self.current - self.baseline) / self.baseline)
+
+
+# Compares the median time of every phase and the clock throughput of each benchmark with its baseline. A phase
+# regresses when it is more than threshold slower, as a fraction. Phases quicker than min_seconds in the
+# baseline are too short to time reliably and are skipped. A change in cycles is reported too, as the bench no
+# longer simulates the same thing. Benchmarks the baseline does not have are left to missing_from_baseline.
+def compare_reports(report: Dict, baseline: Dict, threshold: float = 0.1, min_seconds: float = 1e-3) -> List[Regression]:
+    if report["check_interval"] != baseline["check_interval"]:
+        raise ValueError("Cannot compare a report clocked {} cycles at a time with a baseline clocked {} at a time".format(
+            report["check_interval"], baseline["check_interval"]))
+    regressions = []
+    for name, current in sorted(report["benchmarks"].items()):
+        reference = baseline["benchmarks"].get(name)
+        if reference is None:
+            continue
+        if current["cycles"] != reference["cycles"]:
+            regressions.append(Regression(name, "cycles", reference["cycles"], current["cycles"]))
+        for phase in BENCHMARK_PHASES:
+            before = reference["phases"][phase]["median"]
+            after = current["phases"][phase]["median"]
+            if before >= min_seconds and after > before * (1.0 + threshold):
+                regressions.append(Regression(name, phase, before, after))
+        if (reference["phases"]["clock"]["median"] >= min_seconds and
+                current["cycles_per_second"] * (1.0 + threshold) < reference["cycles_per_second"]):
+            regressions.append(Regression(name, "cycles_per_second", reference["cycles_per_second"],
+                                          current["cycles_per_second"]))
+    return regressions
+
+
+def missing_from_baseline(report: Dict, baseline: Dict) -> List[str]:
+    return sorted(name for name in report["benchmarks"] if name not in baseline["benchmarks"])
+
+
+def summary(report: Dict) -> str:
+    # Median milliseconds of every phase
+    lines = ["{:<48} {:>10} {:>14} ".format("benchmark", "cycles", "cycles/s") +
+             " ".join("{:>10}".format(phase) for phase in BENCHMARK_PHASES)]
+    for name, result in sorted(report["benchmarks"].items()):
+        lines.append("{:<48} {:>10} {:>14.0f} ".format(name, result["cycles"], result["cycles_per_second"]) +
+                     " ".join("{:>8.3f}ms".format(1000.0 * result["phases"][phase]["median"]) for phase in BENCHMARK_PHASES))
+    return "\n".join(lines)
+
+
+# The options every benchmark suite shares, suites add the workloads they scale over
+def benchmark_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("model_path", type=str, help="Path to the model shared library")
+    parser.add_argument("-n", "--repeats", type=int, default=5, help="Timed runs of every benchmark, after one warm-up")
+    parser.add_argument("-k", "--filter", type=str, default=None, help="Only run benchmarks whose name matches this regex")
+    parser.add_argument("-o", "--output", type=str, default="benchmarks.json", help="Path to write the report to")
+    parser.add_argument("-b", "--baseline", type=str, default=None, help="Report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="How much slower than the baseline a phase may get, as a fraction")
+    parser.add_argument("--update-baseline", dest="update_baseline", action="store_true",
+                        help="Write the report over the baseline instead of comparing with it")
+    parser.add_argument("--check-interval", type=int, dest="check_interval", default=1,
+                        help="Cycles per call to the model when clocking, only exact above 1 if the model library "
+                             "stops clocking once idle")
+    return parser
+
+
+def run_suite(args: argparse.Namespace, cases: List[BenchmarkCase]) -> None:
+    if args.update_baseline and args.baseline is None:
+        print("--update-baseline needs a --baseline to write")
+        sys.exit(1)
+    if args.filter is not None:
+        cases = [case for case in cases if re.search(args.filter, case.name)]
+    report = run_benchmarks(args.model_path, cases, args.repeats, args.check_interval)
+    write_report(args.output, report)
+    print(summary(report))
+
+    if args.baseline is None:
+        return
+    if args.update_baseline or not os.path.exists(args.baseline):
+        write_report(args.baseline, report)
+        print("Baseline written to {}".format(args.baseline))
+        return
+
+    baseline = load_report(args.baseline)
+    try:
+        regressions = compare_reports(report, baseline, args.threshold)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    missing = missing_from_baseline(report, baseline)
+    if missing:
+        print("Not in {}, so not compared:".format(args.baseline))
+        for name in missing:
+            print("    {}".format(name))
+    if regressions:
+        print("Regressed against {} by more than {:.0f}%:".format(args.baseline, 100.0 * args.threshold))
+        for regression in regressions:
+            print("    {}".format(regression))
+        sys.exit(1)
+    print("No regressions against {}".format(args.baseline))
@@ -0,0 +1,239 @@
+import argparse
+import collections
+import os
+import queue
+import threading
+import time
+import traceback
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Iterable, Iterator, Optional, Tuple
+
+from common.streaming_experiment import ExperimentSpec, Point, TestResult, _init_worker, _run_point
+
+# Messages are tuples whose first item says what they are. Workers send ("ask",), ("alive",),
+# ("result", id, TestResult) and ("failed", id, error). The broker answers an ask with ("point", id, Point),
+# ("wait", seconds) or ("done",).
+
+
+# Points and specs are pickled, so whoever can connect with the authkey can run code on the broker and its
+# workers. Without a host the broker only listens on this machine; name one, or 0.0.0.0, to take workers from
+# other machines.
+def parse_address(address: str) -> Tuple[str, int]:
+    host, _, port = address.rpartition(":")
+    return host or "localhost", int(port)
+
+
+"""
+ Hands the points of a sweep out over TCP to worker agents on any number of machines and gathers their
+ results. Every point handed out is leased to its worker. When the worker's connection drops, or its lease
+ runs out without a sign of life, the point goes back in the queue for another worker, up to max_attempts
+ times. Like imap_bounded, at most max_pending points are pulled from the sweep ahead of the workers.
+"""
+class Broker:
+    def __init__(self, address: Tuple[str, int], authkey: bytes, lease: float = 600.0, max_attempts: int = 3,
+                 max_pending: int = 64):
+        self.address = address
+        self.authkey = authkey
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.todo = collections.deque()
+        # id -> [point, worker, deadline]
+        self.leases = {}
+        self.attempts = {}
+        self.finished = False
+        self.events = queue.Queue()
+        self.workers = 0
+
+    def run(self, spec: ExperimentSpec, points: Iterable[Point]) -> Iterator[TestResult]:
+        self.spec = spec
+        listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept, args=(listener,), daemon=True).start()
+        points = iter(points)
+        next_id = 0
+        exhausted = False
+        try:
+            while True:
+                with self.lock:
+                    while not exhausted and len(self.todo) < self.max_pending:
+                        point = next(points, None)
+                        if point is None:
+                            exhausted = True
+                            break
+                        self.todo.append((next_id, point))
+                        self.attempts[next_id] = 0
+                        next_id += 1
+                    if exhausted and not self.todo and not self.leases:
+                        break
+                    self._reclaim_expired()
+
+                try:
+                    event = self.events.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                if event[0] == "result":
+                    yield event[1]
+                elif event[0] == "failed":
+                    raise RuntimeError("Point {} failed on {} workers, last error:\n{}".format(
+                        event[1], self.max_attempts, event[2]))
+        finally:
+            with self.lock:
+                self.finished = True
+            listener.close()
+
+    def _accept(self, listener: Listener) -> None:
+        while True:
+            try:
+                connection = listener.accept()
+            except (OSError, EOFError):
+                return
+            with self.lock:
+                self.workers += 1
+                worker = self.workers
+            threading.Thread(target=self._serve, args=(connection, worker), daemon=True).start()
+
+    def _serve(self, connection: Connection, worker: int) -> None:
+        try:
+            connection.send(("spec", self.spec))
+            while True:
+                message = connection.recv()
+                if message[0] == "ask":
+                    connection.send(self._hand_out(worker))
+                elif message[0] == "alive":
+                    self._renew(worker)
+                elif message[0] == "result":
+                    with self.lock:
+                        lease = self.leases.pop(message[1], None)
+                    # A result for a lease that was already given away again is still a good result, but only
+                    # the first one to arrive counts
+                    if lease is not None:
+                        self.events.put(("result", message[2]))
+                elif message[0] == "failed":
+                    with self.lock:
+                        lease = self.leases.pop(message[1], None)
+                        if lease is not None:
+                            self._retry(message[1], lease[0], message[2])
+        except (EOFError, OSError):
+            pass
+        finally:
+            connection.close()
+            # Whatever this worker still held goes to someone else
+            with self.lock:
+                for point_id, lease in list(self.leases.items()):
+                    if lease[1] == worker:
+                        del self.leases[point_id]
+                        self._retry(point_id, lease[0], "Worker {} went away".format(worker))
+
+    def _hand_out(self, worker: int) -> Tuple:
+        with self.lock:
+            if self.todo:
+                point_id, point = self.todo.popleft()
+                self.attempts[point_id] += 1
+                self.leases[point_id] = [point, worker, time.monotonic() + self.lease]
+                return "point", point_id, point
+            if self.finished:
+                return "done",
+        return "wait", 0.5
+
+    def _renew(self, worker: int) -> None:
+        with self.lock:
+            for lease in self.leases.values():
+                if lease[1] == worker:
+                    lease[2] = time.monotonic() + self.lease
+
+    def _reclaim_expired(self) -> None:
+        now = time.monotonic()
+        for point_id, lease in list(self.leases.items()):
+            if lease[2] < now:
+                del self.leases[point_id]
+                self._retry(point_id, lease[0], "Lease of worker {} ran out".format(lease[1]))
+
+    def _retry(self, point_id: int, point: Point, error: str) -> None:
+        # Called with the lock held
+        if self.attempts[point_id] >= self.max_attempts:
+            self.events.put(("failed", point[0], error))
+        else:
+            self.todo.appendleft((point_id, point))
+
+
+# A worker agent: connects to the broker, runs the points it is given one at a time and sends back the results
+# until the broker has nothing left. It keeps retrying to connect for connect_timeout seconds, so workers can
+# be started before the broker. model_path overrides the model library of the spec, for machines where it is
+# installed somewhere else.
+def run_worker(address: Tuple[str, int], authkey: bytes, model_path: Optional[str] = None,
+               connect_timeout: float = 60.0, heartbeat: float = 30.0) -> int:
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            connection = Client(address, authkey=authkey)
+            break
+        except ConnectionRefusedError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.5)
+
+    send_lock = threading.Lock()
+    stop = threading.Event()
+
+    def send(message):
+        with send_lock:
+            connection.send(message)
+
+    def keep_alive():
+        while not stop.wait(heartbeat):
+            try:
+                send(("alive",))
+            except (OSError, EOFError):
+                return
+
+    _, spec = connection.recv()
+    if model_path is not None:
+        spec.path = model_path
+    _init_worker(spec)
+    threading.Thread(target=keep_alive, daemon=True).start()
+
+    completed = 0
+    try:
+        while True:
+            send(("ask",))
+            reply = connection.recv()
+            if reply[0] == "done":
+                return completed
+            if reply[0] == "wait":
+                time.sleep(reply[1])
+                continue
+
+            _, point_id, (name, point) = reply
+            try:
+                result = _run_point((name, point))
+            except Exception:
+                send(("failed", point_id, traceback.format_exc()))
+                continue
+            send(("result", point_id, result))
+            completed += 1
+    except (EOFError, OSError):
+        # The broker finished and closed the connection
+        return completed
+    finally:
+        stop.set()
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a worker agent for a distributed experiment")
+    parser.add_argument("address", type=str, help="host:port of the broker")
+    parser.add_argument("-k", "--authkey", type=str, required=True,
+                        help="Shared secret of the broker, printed by the experiment when it starts the broker")
+    parser.add_argument("-m", "--model-path", type=str, dest="model_path", default=None,
+                        help="Path to the model library on this machine, if not where the broker has it")
+    parser.add_argument("-d", "--run-directory", type=str, dest="run_directory", default="_worker",
+                        help="Directory the tests of this worker run in")
+    args = parser.parse_args()
+
+    os.makedirs(args.run_directory, exist_ok=True)
+    os.chdir(args.run_directory)
+    print("Ran {} tests".format(run_worker(parse_address(args.address), args.authkey.encode("utf-8"), args.model_path)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+from enum import Enum
+from typing import Callable, Optional
+
+from hestia.model import Model
+
+
+class StopReason(Enum):
+    IDLE = "idle"
+    MAX_CYCLES = "max_cycles"
+    PRUNED = "pruned"
+
+
+"""
+ How far a call to run_until_idle clocked the model and why it stopped
+"""
+class ClockResult:
+    def __init__(self, cycles: int, reason: StopReason):
+        self.cycles = cycles
+        self.reason = reason
+
+    def __repr__(self) -> str:
+        return "ClockResult(cycles={}, reason={})".format(self.cycles, self.reason.value)
+
+
+# Clocks the model until it is no longer busy, check_interval cycles per call to the native side. on_step,
+# when given, is called with the model after every step, e.g. to sample its counters.
+#
+# Stepping one cycle at a time is always exact. A larger check_interval saves a Python call per cycle, but the
+# finishing time is only exact when Model.clock(n) stops as soon as the model goes idle. A library that runs all
+# n cycles regardless adds up to check_interval - 1 cycles to every result. Check a library with
+# tests/test_clocking.py before opting in.
+def run_until_idle(model: Model, max_cycles: Optional[int] = None, check_interval: int = 1,
+                   on_step: Optional[Callable[[Model], None]] = None) -> ClockResult:
+    if check_interval < 1:
+        raise ValueError("check_interval must be at least 1, got {}".format(check_interval))
+
+    start = model.get_time()
+    elapsed = 0
+    while max_cycles is None or elapsed < max_cycles:
+        step = check_interval if max_cycles is None else min(check_interval, max_cycles - elapsed)
+        busy = model.clock(step)
+        elapsed = model.get_time() - start
+        if on_step is not None:
+            on_step(model)
+        if not busy:
+            return ClockResult(elapsed, StopReason.IDLE)
+    return ClockResult(elapsed, StopReason.MAX_CYCLES)
+
+
+# Like run_until_idle, but gives up as soon as pruned(time) says the run can no longer be of any use.
+# The check happens every check_interval cycles, so a pruned run overshoots by less than that. Larger
+# intervals rely on Model.clock(n) stopping at idle, as for run_until_idle.
+def run_until_pruned(model: Model, pruned: Callable[[int], bool], max_cycles: Optional[int] = None,
+                     check_interval: int = 1, on_step: Optional[Callable[[Model], None]] = None) -> ClockResult:
+    start = model.get_time()
+    elapsed = 0
+    while max_cycles is None or elapsed < max_cycles:
+        step = check_interval if max_cycles is None else min(check_interval, max_cycles - elapsed)
+        busy = model.clock(step)
+        now = model.get_time()
+        elapsed = now - start
+        if on_step is not None:
+            on_step(model)
+        if not busy:
+            return ClockResult(elapsed, StopReason.IDLE)
+        if pruned(now):
+            return ClockResult(elapsed, StopReason.PRUNED)
+    return ClockResult(elapsed, StopReason.MAX_CYCLES)
@@ -0,0 +1,246 @@
+import json
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Dict, List
+
+from hestia.model import Model
+
+MAGIC = b"HSTC"
+# Magic, format version and header length
+PREAMBLE = struct.Struct("<4sII")
+VERSION = 1
+
+
+# Array type codes from narrowest to widest, with the little endian NumPy dtype each one is stored as
+WIDTHS = [(code, "<i{}".format(array(code).itemsize)) for code in ("b", "h", "i", "q")]
+
+
+def narrowest_width(values: array):
+    return width_of(min(values, default=0), max(values, default=0))
+
+
+def width_of(low: int, high: int):
+    for code, dtype in WIDTHS:
+        bits = 8 * array(code).itemsize
+        if -(1 << (bits - 1)) <= low and high < (1 << (bits - 1)):
+            return code, dtype
+    raise OverflowError("Counter values do not fit in 64 bits")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+"""
+ A binary columnar alternative to the model's csv sampler. Each counter is written as its own fixed width
+ column, as narrow as its values allow, after a small json header. The file can be memory mapped and read as
+ NumPy arrays without any parsing, see sampler_loader.
+
+ Samples are taken from Python, each one fetching every counter of the model, so the experiment only clocks
+ in steps of period between them; the csv sampler remains the cheaper choice when every cycle is wanted.
+ Every chunk_rows samples are spilled to a file next to path, so memory stays bounded however long a test
+ runs, and close copies the spilled chunks into place one column at a time.
+"""
+class ColumnarSampler:
+    def __init__(self, path: str, pattern: str, period: int = 1, chunk_rows: int = 65536):
+        self.path = path
+        self.pattern = re.compile(pattern)
+        self.period = period
+        self.chunk_rows = chunk_rows
+        self.columns = None
+        self.times = array('q')
+        self.values = []
+        # Rows of every chunk spilled so far, and the smallest and largest value of every column over them
+        self.chunks = []
+        self.low = []
+        self.high = []
+        self.spill = None
+
+    def sample(self, model: Model) -> None:
+        counters = model.get_all_counter_values()
+        if self.columns is None:
+            # The counters of a model are fixed once it is set up, so select the columns once
+            self.columns = sorted(name for name in counters if self.pattern.fullmatch(name))
+            self.values = [array('q') for _ in self.columns]
+        self.times.append(model.get_time())
+        for column, name in zip(self.values, self.columns):
+            column.append(counters[name])
+        if len(self.times) >= self.chunk_rows:
+            self.flush()
+
+    # Appends the samples held in memory to the spill file, one column after the other
+    def flush(self) -> None:
+        if not self.times:
+            return
+        if self.spill is None:
+            self.spill = open(self.path + ".part", 'w+b')
+            self.low = [None] * (len(self.columns) + 1)
+            self.high = [None] * (len(self.columns) + 1)
+        for i, column in enumerate([self.times] + self.values):
+            column.tofile(self.spill)
+            low = min(column)
+            high = max(column)
+            self.low[i] = low if self.low[i] is None else min(self.low[i], low)
+            self.high[i] = high if self.high[i] is None else max(self.high[i], high)
+        self.chunks.append(len(self.times))
+        self.times = array('q')
+        self.values = [array('q') for _ in self.values]
+
+    def close(self) -> None:
+        if self.spill is None:
+            write_columnar(self.path, self.columns or [], self.times, self.values, self.period)
+            return
+        self.flush()
+        try:
+            self._write_spilled()
+        finally:
+            self.spill.close()
+            os.remove(self.path + ".part")
+
+    def _write_spilled(self) -> None:
+        names = ["time"] + self.columns
+        rows = sum(self.chunks)
+        layout = []
+        offset = 0
+        for name, low, high in zip(names, self.low, self.high):
+            code, dtype = width_of(low, high)
+            layout.append({"name": name, "dtype": dtype, "offset": offset})
+            offset = _align(offset + rows * array(code).itemsize)
+
+        encoded = json.dumps({"encoding": "dense", "rows": rows, "period": self.period, "columns": layout}).encode("utf-8")
+        data_start = _align(PREAMBLE.size + len(encoded))
+        item = array('q').itemsize
+        with open(self.path, 'wb') as f:
+            f.write(PREAMBLE.pack(MAGIC, VERSION, len(encoded)))
+            f.write(encoded)
+            for i, entry in enumerate(layout):
+                code = next(code for code, dtype in WIDTHS if dtype == entry["dtype"])
+                f.seek(data_start + entry["offset"])
+                chunk_start = 0
+                for chunk in self.chunks:
+                    # A chunk holds every column of its rows in turn
+                    self.spill.seek((chunk_start + i * chunk) * item)
+                    values = array('q')
+                    values.fromfile(self.spill, chunk)
+                    narrowed = array(code, values)
+                    if sys.byteorder != "little":
+                        narrowed.byteswap()
+                    narrowed.tofile(f)
+                    chunk_start += chunk * len(names)
+
+
+def write_columnar(path: str, columns: List[str], times: array, values: List[array], period: int) -> None:
+    blocks = [("time", times)]
+    blocks.extend(zip(columns, values))
+
+    layout = []
+    arrays = []
+    for name, column in blocks:
+        layout.append({"name": name})
+        arrays.append((layout[-1], column))
+
+    write_blocks(path, {"encoding": "dense", "rows": len(times), "period": period, "columns": layout}, arrays)
+
+
+# Writes the header followed by every array at its narrowest width, recording the dtype and offset of each
+# array in the header entry it is paired with
+def write_blocks(path: str, header: Dict, arrays: List) -> None:
+    data = []
+    offset = 0
+    for entry, values in arrays:
+        code, dtype = narrowest_width(values)
+        narrowed = array(code, values)
+        if sys.byteorder != "little":
+            narrowed.byteswap()
+        entry["dtype"] = dtype
+        entry["offset"] = offset
+        data.append(narrowed)
+        offset = _align(offset + len(narrowed) * narrowed.itemsize)
+
+    encoded = json.dumps(header).encode("utf-8")
+    data_start = _align(PREAMBLE.size + len(encoded))
+    with open(path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(encoded)))
+        f.write(encoded)
+        for (entry, _), narrowed in zip(arrays, data):
+            f.seek(data_start + entry["offset"])
+            narrowed.tofile(f)
+
+
+def read_columnar_header(path: str) -> Dict:
+    with open(path, 'rb') as f:
+        magic, version, header_length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not a version {} columnar sampler file".format(path, VERSION))
+        header = json.loads(f.read(header_length).decode("utf-8"))
+    header["data_start"] = _align(PREAMBLE.size + header_length)
+    return header
+
+
+"""
+ A sampler that only records a counter when its value changes, as (time, value) pairs. Counters that sit flat
+ for long stretches, like the idle tail of a test, then take no space. The sample times themselves are stored
+ as runs of evenly spaced times, so sampling every cycle stays cheap for long runs. Readers rebuild the dense
+ series on demand, see sampler_loader.
+
+ The savings are on disk only: every sample still fetches all counters of the model from Python and compares
+ them, so an idle stretch costs as much to sample as a busy one.
+"""
+class ChangeSampler:
+    def __init__(self, path: str, pattern: str, period: int = 1):
+        self.path = path
+        self.pattern = re.compile(pattern)
+        self.period = period
+        self.columns = None
+        self.last = []
+        self.change_times = []
+        self.change_values = []
+        # Runs of [start, step, count] sample times
+        self.time_segments = []
+        self.rows = 0
+
+    def sample(self, model: Model) -> None:
+        counters = model.get_all_counter_values()
+        if self.columns is None:
+            self.columns = sorted(name for name in counters if self.pattern.fullmatch(name))
+            self.last = [None] * len(self.columns)
+            self.change_times = [array('q') for _ in self.columns]
+            self.change_values = [array('q') for _ in self.columns]
+
+        time = model.get_time()
+        self.add_time(time)
+        for i, name in enumerate(self.columns):
+            value = counters[name]
+            if value != self.last[i]:
+                self.last[i] = value
+                self.change_times[i].append(time)
+                self.change_values[i].append(value)
+
+    def add_time(self, time: int) -> None:
+        self.rows += 1
+        if self.time_segments:
+            segment = self.time_segments[-1]
+            if segment[2] == 1:
+                segment[1] = time - segment[0]
+                segment[2] = 2
+                return
+            if time == segment[0] + segment[1] * segment[2]:
+                segment[2] += 1
+                return
+        self.time_segments.append([time, 0, 1])
+
+    def close(self) -> None:
+        layout = []
+        arrays = []
+        for name, times, values in zip(self.columns or [], self.change_times, self.change_values):
+            entry = {"name": name, "changes": len(times), "times": {}, "values": {}}
+            layout.append(entry)
+            arrays.append((entry["times"], times))
+            arrays.append((entry["values"], values))
+
+        header = {"encoding": "changes", "rows": self.rows, "period": self.period,
+                  "time_segments": self.time_segments, "columns": layout}
+        write_blocks(self.path, header, arrays)
@@ -0,0 +1,140 @@
+import re
+from multiprocessing.pool import Pool
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from hestia.container import Container
+
+from common.clocking import run_until_idle
+from common.model_pool import create_model
+
+"""
+ One model variant of a workload: how to build its container plus the clock domains and memories its
+ model needs
+"""
+class Variant:
+    def __init__(self, name: str, create_test: Callable[[], Container], clock_domains: Dict[str, int],
+                 memories: Optional[Dict[str, Dict[str, int]]] = None):
+        self.name = name
+        self.create_test = create_test
+        self.clock_domains = clock_domains
+        self.memories = memories if memories is not None else {}
+
+
+"""
+ A counter that does not agree between the reference and a variant. A missing value is None.
+"""
+class CounterMismatch:
+    def __init__(self, counter: str, expected: Optional[int], actual: Optional[int]):
+        self.counter = counter
+        self.expected = expected
+        self.actual = actual
+
+    def __str__(self) -> str:
+        return "{}: expected {}, got {}".format(self.counter, self.expected, self.actual)
+
+
+"""
+ The result of comparing every variant's counters against the first (reference) variant. skipped holds, per
+ variant, the counters that were left out of the comparison because not every variant has them.
+"""
+class EquivalenceReport:
+    def __init__(self, reference: str):
+        self.reference = reference
+        self.times = {}
+        self.mismatches = {}
+        self.skipped = {}
+
+    def is_equivalent(self) -> bool:
+        return not any(self.mismatches.values())
+
+    def to_dict(self) -> Dict:
+        return {
+            "reference": self.reference,
+            "times": self.times,
+            "mismatches": {variant: [{"counter": m.counter, "expected": m.expected, "actual": m.actual} for m in mismatches]
+                           for variant, mismatches in self.mismatches.items()},
+            "skipped": self.skipped,
+        }
+
+    def __str__(self) -> str:
+        lines = ["{} ({} clocks) reference".format(self.reference, self.times[self.reference])]
+        for variant, mismatches in self.mismatches.items():
+            status = "matches" if not mismatches else "has {} mismatches with".format(len(mismatches))
+            lines.append("{} ({} clocks) {} {}".format(variant, self.times[variant], status, self.reference))
+            lines.extend("    " + str(mismatch) for mismatch in mismatches)
+        skipped = sum(len(counters) for counters in self.skipped.values())
+        if skipped:
+            lines.append("{} counters not shared by every variant were not compared".format(skipped))
+        return "\n".join(lines)
+
+
+def diff_counters(expected: Dict[str, int], actual: Dict[str, int]) -> List[CounterMismatch]:
+    mismatches = []
+    for counter in sorted(set(expected) | set(actual)):
+        if expected.get(counter) != actual.get(counter):
+            mismatches.append(CounterMismatch(counter, expected.get(counter), actual.get(counter)))
+    return mismatches
+
+
+# The counters every variant has. Counters of a component only some variants have, like the memory of the
+# memory bound processor, cannot be compared.
+def shared_counters(variant_counters: List[Dict[str, int]]) -> Set[str]:
+    shared = set(variant_counters[0])
+    for counters in variant_counters[1:]:
+        shared &= set(counters)
+    return shared
+
+
+def run_variant(path: str, variant: Variant, counters: str = ".*") -> Tuple[int, Dict[str, int]]:
+    model = create_model(path, variant.clock_domains, variant.memories)
+    test = variant.create_test()
+    test.build(model)
+
+    if not test.validate():
+        raise RuntimeError("{} is not in a valid state".format(variant.name))
+
+    model.setup()
+    run_until_idle(model)
+    model.tear_down()
+
+    # Counters are named after the container, which differs between variants, so compare them without it
+    prefix = test.name + "."
+    pattern = re.compile(counters)
+    values = {}
+    for name, value in model.get_all_counter_values().items():
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+        if pattern.fullmatch(name):
+            values[name] = value
+    return model.get_time(), values
+
+
+def _run_variant(job: Tuple[str, Variant, str]) -> Tuple[int, Dict[str, int]]:
+    return run_variant(*job)
+
+
+# Runs every variant of the workload in its own process and diffs each one's counters against the first. By
+# default only the counters every variant has are compared. Given a regex, every counter it matches is compared
+# and a counter missing from a variant is a mismatch.
+def check_equivalence(path: str, variants: List[Variant], counters: Optional[str] = None,
+                      number_of_jobs: Optional[int] = None) -> EquivalenceReport:
+    if number_of_jobs is None:
+        number_of_jobs = len(variants)
+    pattern = counters if counters is not None else ".*"
+    with Pool(number_of_jobs) as p:
+        results = p.map(_run_variant, [(path, variant, pattern) for variant in variants], chunksize=1)
+
+    report = EquivalenceReport(variants[0].name)
+    if counters is None:
+        shared = shared_counters([variant_counters for _, variant_counters in results])
+        for variant, (_, variant_counters) in zip(variants, results):
+            report.skipped[variant.name] = sorted(set(variant_counters) - shared)
+        results = [(time, {name: value for name, value in variant_counters.items() if name in shared})
+                   for time, variant_counters in results]
+
+    reference_counters = results[0][1]
+    for variant, (time, variant_counters) in zip(variants, results):
+        report.times[variant.name] = time
+        if variant is not variants[0]:
+            report.mismatches[variant.name] = diff_counters(reference_counters, variant_counters)
+    return report
@@ -0,0 +1,37 @@
+import json
+import os
+from typing import Dict, List
+
+"""
+ An append only record of finished tests, one json object per line. Every line is flushed as soon as it is
+ written, so a run that dies part way through can pick up where it stopped.
+"""
+class Journal:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def load(self) -> List[Dict]:
+        if not os.path.exists(self.path):
+            return []
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        # A run killed mid write leaves a partial last line behind, drop it so appends start on a fresh line
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+
+        return [json.loads(line) for line in data[:end].decode("utf-8").splitlines() if line]
+
+    def append(self, record: Dict) -> None:
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,99 @@
+import time
+import warnings
+from typing import Dict, Optional
+
+from hestia.memory_parameters import MemoryParameters
+from hestia.model import Model
+
+
+def create_model(path: str, clock_domains: Dict[str, int], memories: Dict[str, Dict[str, int]],
+                 model: Optional[Model] = None) -> Model:
+    if model is None:
+        model = Model(path)
+    for domain, period in clock_domains.items():
+        model.add_clock_domain(domain, period)
+
+    # Memories start empty: MemoryParameters has no field for an initial image and the model has no call to write
+    # memory, so a test's data has to come from its components
+    for memory_name, fields in memories.items():
+        memory_params = MemoryParameters()
+        for field, value in fields.items():
+            setattr(memory_params, field, value)
+        model.create_memory(memory_name, memory_params)
+    return model
+
+
+# Only model libraries that can clear a model for its next test have Model.reset
+def supports_reset() -> bool:
+    return hasattr(Model, "reset")
+
+
+def warn_without_reset() -> None:
+    if not supports_reset():
+        warnings.warn("This hestia Model has no reset, so every test builds a fresh model and reuse_models has "
+                      "no effect", RuntimeWarning, stacklevel=3)
+
+
+"""
+ A worker resident model. The model library is loaded and initialised once per process and, with reuse set,
+ the same model is reset between tests. Released model libraries have no Model.reset, so reuse is off unless
+ asked for and every test gets a fresh model, as it would without the pool.
+"""
+class ModelPool:
+    def __init__(self, path: str, clock_domains: Dict[str, int], memories: Dict[str, Dict[str, int]], reuse: bool = False):
+        self.path = path
+        self.clock_domains = clock_domains
+        self.memories = memories
+        self.reuse = reuse and supports_reset()
+        self.model = None
+        # How long the last acquire took and whether it reused the existing model
+        self.last_time = 0.0
+        self.last_reused = False
+
+    def acquire(self) -> Model:
+        start = time.perf_counter()
+        self.last_reused = self.model is not None and self.reuse
+        if self.last_reused:
+            self.model.reset()
+            create_model(self.path, self.clock_domains, self.memories, self.model)
+        else:
+            self.model = create_model(self.path, self.clock_domains, self.memories)
+        self.last_time = time.perf_counter() - start
+        return self.model
+
+    def discard(self) -> None:
+        # A test failed part way through, never hand its model to the next test
+        self.model = None
+
+    def release(self) -> None:
+        # Without reset support the model cannot be reused, so drop it as soon as the test is done
+        if not self.reuse:
+            self.model = None
+
+
+"""
+ The model construction statistics of a whole experiment, combined from every worker
+"""
+class ModelReuseReport:
+    def __init__(self):
+        self.create_times = []
+        self.reset_times = []
+
+    def add(self, model_time: float, reused: bool) -> None:
+        if reused:
+            self.reset_times.append(model_time)
+        else:
+            self.create_times.append(model_time)
+
+    def saved_time(self) -> float:
+        if not self.create_times:
+            return 0.0
+        average_create_time = sum(self.create_times) / len(self.create_times)
+        return average_create_time * len(self.reset_times) - sum(self.reset_times)
+
+    def __str__(self) -> str:
+        if not supports_reset():
+            return "Models created: {} ({:.3f}s), none reused as this model library has no Model.reset".format(
+                len(self.create_times), sum(self.create_times))
+        return "Models created: {} ({:.3f}s), models reused: {} ({:.3f}s), estimated time saved: {:.3f}s".format(
+            len(self.create_times), sum(self.create_times), len(self.reset_times), sum(self.reset_times), self.saved_time())
@@ -0,0 +1,133 @@
+import os
+import re
+import time
+from typing import Dict, List
+
+from common.model_pool import ModelPool
+from common.streaming_experiment import ExperimentSpec, Point, TestResult
+from common.timing import PhaseTimer
+
+
+"""
+ Follows the counters of every container sharing a model. Counters are named after the container they belong
+ to, so each container's counters are the ones under its name. The model only says whether any of its tests
+ is still busy, so a container is done once its own counters stop changing for good, and its time is the
+ model time at the end of the last step in which any of them changed.
+"""
+class TenantTracker:
+    def __init__(self, names: List[str]):
+        self.prefixes = {name: name + "." for name in names}
+        self.keys = None
+        self.last = {}
+        self.last_change = {name: 0 for name in names}
+
+    def update(self, now: int, counters: Dict[str, int]) -> None:
+        if self.keys is None:
+            if not counters:
+                return
+            # Counters are fixed once the model has them, so sort them into their containers once
+            self.keys = {name: [key for key in counters if key.startswith(prefix)] for name, prefix in self.prefixes.items()}
+        for name, keys in self.keys.items():
+            values = tuple(counters[key] for key in keys)
+            if values != self.last.get(name):
+                self.last[name] = values
+                self.last_change[name] = now
+
+    def counters(self, name: str, counters: Dict[str, int]) -> Dict[str, int]:
+        return {key: counters[key] for key in self.keys.get(name, [])} if self.keys is not None else {}
+
+
+# Narrows a sampler made for a whole model down to one container, writing into the container's directory
+def _scope_sampler(sampler, name: str):
+    sampler.pattern = re.compile(re.escape(name) + r"\." + sampler.pattern.pattern)
+    sampler.path = os.path.join(name, sampler.path)
+    return sampler
+
+
+"""
+ What a sampler sees of the model at one sample: every tenant's sampler reads the counters fetched once for
+ the whole batch instead of fetching them again for itself
+"""
+class _Sample:
+    def __init__(self, time: int, counters: Dict[str, int]):
+        self.time = time
+        self.counters = counters
+
+    def get_time(self) -> int:
+        return self.time
+
+    def get_all_counter_values(self) -> Dict[str, int]:
+        return self.counters
+
+
+# Builds every test of the batch into one model under its own name and clocks them all together, looking at
+# the counters every spec.tenant_interval cycles, or every sampler period when the tests are sampled. Each
+# test finishes at its own last counter change, see TenantTracker, rounded up to the end of that step. A test
+# run on its own finishes when the whole model goes idle instead, which is later when its components keep
+# working after their last transfer. Pruning and profiling follow a single test and are refused.
+def run_batch(spec: ExperimentSpec, models: ModelPool, points: List[Point]) -> List[TestResult]:
+    if spec.best is not None or spec.profile:
+        raise ValueError("Tests sharing a model cannot be pruned or profiled one by one")
+    start = time.perf_counter()
+    check_interval = spec.tenant_interval
+    timer = PhaseTimer()
+    try:
+        with timer.phase("model"):
+            model = models.acquire()
+        with timer.phase("build"):
+            tests = [spec.create_test(name, point) for name, point in points]
+            for test in tests:
+                test.build(model)
+        with timer.phase("configure"):
+            spec.configure_model(model)
+        with timer.phase("validate"):
+            if not model.validate():
+                raise RuntimeError("Batch of {} to {} is not in a valid state".format(points[0][0], points[-1][0]))
+
+        samplers = []
+        if spec.create_sampler is not None:
+            for name, _ in points:
+                os.makedirs(name, exist_ok=True)
+                sampler = spec.create_sampler()
+                if sampler is not None:
+                    samplers.append(_scope_sampler(sampler, name))
+                    check_interval = sampler.period
+
+        tracker = TenantTracker([name for name, _ in points])
+        with timer.phase("setup"):
+            model.setup()
+        with timer.phase("clock"):
+            begin = model.get_time()
+            tracker.update(begin, model.get_all_counter_values())
+            busy = True
+            while busy:
+                busy = model.clock(check_interval)
+                now = model.get_time()
+                counters = model.get_all_counter_values()
+                tracker.update(now, counters)
+                sample = _Sample(now, counters)
+                for sampler in samplers:
+                    sampler.sample(sample)
+        with timer.phase("tear_down"):
+            model.tear_down()
+            for sampler in samplers:
+                sampler.close()
+    except BaseException:
+        models.discard()
+        raise
+    finally:
+        models.release()
+
+    # The batch shares its model, so each test is charged an equal part of the time it took
+    wall_time = (time.perf_counter() - start) / len(points)
+    phases = {phase: {kind: spent / len(points) for kind, spent in totals.items()} for phase, totals in timer.phases.items()}
+    results = []
+    for name, point in points:
+        result = TestResult(name, point, tracker.last_change[name], tracker.counters(name, counters))
+        result.cycles = tracker.last_change[name] - begin
+        result.phases = phases
+        result.model_time = models.last_time / len(points)
+        result.model_reused = models.last_reused
+        result.wall_time = wall_time
+        results.append(result)
+    return results
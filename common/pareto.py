@@ -0,0 +1,85 @@
+import json
+import os
+from typing import List
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# How many points are compared with each other at once when there are more than two objectives
+_BLOCK = 512
+
+
+# Indices of the points no other point beats in every objective, all objectives being minimised. Points are
+# sorted once, so two objectives take O(n log n). With more, each point is only checked against the frontier
+# found so far, a block of points at a time. Identical points are reported once.
+def pareto_front(objectives: np.ndarray) -> np.ndarray:
+    objectives = np.asarray(objectives)
+    if objectives.ndim != 2:
+        raise ValueError("Expected one row of objectives per point")
+    if objectives.shape[0] == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    # Sorted lexicographically no point can be dominated by one after it
+    order = np.lexsort(objectives.T[::-1])
+    ordered = objectives[order]
+    distinct = np.concatenate(([True], np.any(ordered[1:] != ordered[:-1], axis=1)))
+    unique = ordered[distinct]
+    first = order[distinct]
+    if unique.shape[1] == 1:
+        return first[:1]
+    if unique.shape[1] == 2:
+        # A point is on the frontier when its second objective beats every point before it
+        best_before = np.minimum.accumulate(np.concatenate(([np.inf], unique[:-1, 1])))
+        return np.sort(first[unique[:, 1] < best_before])
+
+    # Work through the sorted points a block at a time: drop what the frontier so far dominates, then what an
+    # earlier point of the same block dominates
+    front = np.zeros((0, unique.shape[1]), dtype=unique.dtype)
+    kept = []
+    for start in range(0, unique.shape[0], _BLOCK):
+        block = unique[start:start + _BLOCK]
+        indices = np.arange(start, start + block.shape[0])
+        if front.shape[0]:
+            dominated = np.zeros(block.shape[0], dtype=bool)
+            for front_start in range(0, front.shape[0], _BLOCK):
+                chunk = front[front_start:front_start + _BLOCK]
+                dominated |= np.all(chunk[None, :, :] <= block[:, None, :], axis=2).any(axis=1)
+            block = block[~dominated]
+            indices = indices[~dominated]
+
+        earlier = np.tril(np.ones((block.shape[0], block.shape[0]), dtype=bool), -1)
+        dominated = (np.all(block[None, :, :] <= block[:, None, :], axis=2) & earlier).any(axis=1)
+        front = np.concatenate((front, block[~dominated]))
+        kept.append(indices[~dominated])
+    return np.sort(first[np.concatenate(kept)])
+
+
+def write_frontier(directory: str, names: List[str], objectives: np.ndarray, labels: List[str]) -> np.ndarray:
+    objectives = np.asarray(objectives)
+    front = pareto_front(objectives)
+    # Sorted along the first objective, so the file reads as the trade-off curve
+    front = front[np.lexsort(objectives[front].T[::-1])] if front.size else front
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "frontier.json"), 'w') as f:
+        json.dump({"objectives": labels,
+                   "points": [dict(name=names[i], **{label: objectives[i, j].item() for j, label in enumerate(labels)})
+                              for i in front]}, f)
+
+    if len(labels) >= 2:
+        plot_frontier(os.path.join(directory, "frontier.png"), objectives, front, labels)
+    return front
+
+
+# Drawn on an Agg figure of its own rather than through pyplot, as common/rendering.py does
+def plot_frontier(path: str, objectives: np.ndarray, front: np.ndarray, labels: List[str]) -> None:
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    axes.scatter(objectives[:, 0], objectives[:, 1], s=4, color="lightgray", label="Tests")
+    axes.plot(objectives[front, 0], objectives[front, 1], marker="o", drawstyle="steps-post", label="Pareto frontier")
+    axes.set_xlabel(labels[0])
+    axes.set_ylabel(labels[1])
+    axes.legend()
+    figure.savefig(path)
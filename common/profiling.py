@@ -0,0 +1,137 @@
+import json
+import time
+from typing import Dict, Iterable, Optional
+
+from hestia.container import Container
+from hestia.model import Model
+
+# The basic stats a connection gets from attach_basic_stats_to_connections
+PUSHED = ".stats.pushed"
+POPPED = ".stats.popped"
+
+
+# Maps the name of every internal connection of the container to the key of the component that owns it
+def connection_owners(container: Container) -> Dict[str, str]:
+    owners = {}
+    for key, component in container.components.items():
+        for name in getattr(component, "internal_connections", {}):
+            owners[name] = key
+    return owners
+
+
+"""
+ Counts how busy every connection of a test is, from the basic stats attach_basic_stats_to_connections adds.
+ The model is clocked a few cycles at a time and each connection whose stats moved during a step is counted
+ active for the cycles of that step, with the transfers it made. Internal connections are also added up per
+ owning component, everything else is reported per connection. Steps where nothing moved are counted as idle.
+
+ This is an activity count, not a time profile: the model library has no per-component timing, and splitting
+ wall time between the connections that moved says nothing when, as in the pipelined benches, nearly every
+ stage moves every cycle. Only connections have stats, so the memory array ports and the work of the drivers
+ do not show up. The profiler's own time is reported as overhead. It is only created when profiling is asked
+ for, so tests run without it pay nothing.
+"""
+class TickProfiler:
+    def __init__(self, path: str = "profile.json", period: int = 1, container: Optional[Container] = None):
+        self.path = path
+        self.period = period
+        self.owners = connection_owners(container) if container is not None else {}
+        # Connections are reported relative to the container, so the profiles of different tests line up
+        self.prefix = container.name + "." if container is not None else ""
+        self.connections = {}
+        self.idle = {"steps": 0, "cycles": 0}
+        self.last_counts = {}
+        self.last_time = None
+        self.overhead = 0.0
+
+    # Call once the model is set up, right before it is first clocked
+    def start(self, model: Model) -> None:
+        self.last_counts = self._counts(model)
+        self.last_time = model.get_time()
+
+    def sample(self, model: Model) -> None:
+        entered = time.perf_counter()
+        now = model.get_time()
+        cycles = now - self.last_time
+        counts = self._counts(model)
+        active = [connection for connection, count in counts.items() if count != self.last_counts.get(connection)]
+        for connection in active:
+            entry = self.connections.setdefault(connection, {"steps": 0, "cycles": 0, "transfers": 0})
+            entry["steps"] += 1
+            entry["cycles"] += cycles
+            entry["transfers"] += count_difference(counts[connection], self.last_counts.get(connection, (0, 0)))
+        if not active:
+            self.idle["steps"] += 1
+            self.idle["cycles"] += cycles
+
+        self.last_counts = counts
+        self.last_time = now
+        self.overhead += time.perf_counter() - entered
+
+    def _counts(self, model: Model) -> Dict[str, tuple]:
+        counts = {}
+        for name, value in model.get_all_counter_values().items():
+            if name.startswith(self.prefix) and name.endswith(PUSHED):
+                connection = name[len(self.prefix):-len(PUSHED)]
+                counts[connection] = (value, counts.get(connection, (0, 0))[1])
+            elif name.startswith(self.prefix) and name.endswith(POPPED):
+                connection = name[len(self.prefix):-len(POPPED)]
+                counts[connection] = (counts.get(connection, (0, 0))[0], value)
+        return counts
+
+    def owner(self, connection: str) -> Optional[str]:
+        # Internal connection counters are named after the component path, so look for the owning component
+        # just above the connection name
+        parts = connection.split(".")
+        if len(parts) >= 2 and self.owners.get(parts[-1]) == parts[-2]:
+            return parts[-2]
+        return None
+
+    def profile(self) -> Dict:
+        components = {}
+        for connection, entry in self.connections.items():
+            owner = self.owner(connection)
+            if owner is not None:
+                totals = components.setdefault(owner, {"cycles": 0, "transfers": 0})
+                totals["cycles"] += entry["cycles"]
+                totals["transfers"] += entry["transfers"]
+
+        return {
+            "step_cycles": self.period,
+            "overhead": self.overhead,
+            "idle": self.idle,
+            "connections": dict(sorted(self.connections.items(), key=by_transfers, reverse=True)),
+            "components": dict(sorted(components.items(), key=by_transfers, reverse=True)),
+        }
+
+    def close(self) -> None:
+        with open(self.path, 'w') as f:
+            json.dump(self.profile(), f, indent=1)
+
+
+def by_transfers(item: tuple) -> int:
+    return item[1]["transfers"]
+
+
+def count_difference(counts: tuple, previous: tuple) -> int:
+    return (counts[0] - previous[0]) + (counts[1] - previous[1])
+
+
+# Adds up the profiles of many tests, matching connections and components by name
+def merge_profiles(paths: Iterable[str]) -> Dict:
+    merged = {"overhead": 0.0, "idle": {"steps": 0, "cycles": 0}, "connections": {}, "components": {}}
+    for path in paths:
+        with open(path, 'r') as f:
+            profile = json.load(f)
+        merged["overhead"] += profile["overhead"]
+        for field in ("steps", "cycles"):
+            merged["idle"][field] += profile["idle"][field]
+        for group in ("connections", "components"):
+            for name, entry in profile[group].items():
+                totals = merged[group].setdefault(name, dict.fromkeys(entry, 0))
+                for field, value in entry.items():
+                    totals[field] += value
+
+    for group in ("connections", "components"):
+        merged[group] = dict(sorted(merged[group].items(), key=by_transfers, reverse=True))
+    return merged
@@ -0,0 +1,31 @@
+from multiprocessing import Lock, Value
+from typing import Optional, Tuple
+
+"""
+ The best (clocks, area) seen so far, shared between every worker of an experiment. A point is dominated
+ once it has run for more clocks than the best point and cannot make up for it with a smaller area.
+"""
+class SharedBest:
+    def __init__(self):
+        self.lock = Lock()
+        # Zero clocks means nothing has finished yet
+        self.clocks = Value('q', 0, lock=False)
+        self.area = Value('q', 0, lock=False)
+
+    def get(self) -> Optional[Tuple[int, int]]:
+        with self.lock:
+            if self.clocks.value == 0:
+                return None
+            return self.clocks.value, self.area.value
+
+    def offer(self, clocks: int, area: int) -> bool:
+        with self.lock:
+            if self.clocks.value != 0 and (clocks, area) >= (self.clocks.value, self.area.value):
+                return False
+            self.clocks.value = clocks
+            self.area.value = area
+            return True
+
+    def dominates(self, clocks: int, area: int) -> bool:
+        best = self.get()
+        return best is not None and best[0] < clocks and best[1] <= area
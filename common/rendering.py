@@ -0,0 +1,148 @@
+import html
+import math
+import os
+from multiprocessing.pool import Pool
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+# The series of a test to plot, by legend label. An optional "time" entry holds the clock of every sample, the
+# x axis is the sample index without one.
+Series = Dict[str, np.ndarray]
+Loader = Callable[[str], Series]
+
+
+# Keeps only the samples a stepped line bends at: the last sample before each change, and both ends. Drawn
+# with drawstyle="steps" the decimated line is the same as the full one. Returns the times of the kept samples
+# when given, their indices otherwise.
+def decimate_steps(values: np.ndarray, times: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    values = np.asarray(values)
+    if times is None or len(times) != values.size:
+        times = np.arange(values.size)
+    if values.size <= 2:
+        return np.asarray(times), values
+    keep = np.flatnonzero(values[1:] != values[:-1])
+    keep = np.concatenate(([0], keep[keep > 0], [values.size - 1]))
+    return np.asarray(times)[keep], values[keep]
+
+
+"""
+ Draws stepped series on a single Agg figure that is reused for every test, instead of going through pyplot's
+ global state and building a new figure each time. Lines and the legend are made once and only their data
+ changes between tests.
+"""
+class StepPlotter:
+    def __init__(self, labels: List[str], xlabel: str, ylabel: str, rows: int = 1, columns: int = 1):
+        self.figure = Figure(figsize=(6.4 * max(1, columns / 2), 4.8 * max(1, rows / 2)))
+        FigureCanvasAgg(self.figure)
+        self.axes = []
+        self.lines = []
+        for i in range(rows * columns):
+            axes = self.figure.add_subplot(rows, columns, i + 1)
+            lines = {label: axes.plot([], [], label=label, drawstyle="steps")[0] for label in labels}
+            if rows * columns == 1:
+                axes.set_xlabel(xlabel)
+                axes.set_ylabel(ylabel)
+                axes.legend()
+            else:
+                # Most of the drawing time goes on tick labels, small multiples only need a few
+                axes.locator_params(nbins=3)
+                axes.tick_params(labelsize="x-small")
+            self.axes.append(axes)
+            self.lines.append(lines)
+        if rows * columns > 1:
+            self.figure.supxlabel(xlabel)
+            self.figure.supylabel(ylabel)
+            self.figure.legend(list(self.lines[0].values()), labels, loc="upper right")
+            self.figure.subplots_adjust(hspace=0.5, wspace=0.3)
+
+    def draw(self, index: int, title: str, series: Series) -> None:
+        axes = self.axes[index]
+        axes.set_visible(True)
+        if len(self.axes) > 1:
+            axes.set_title(title, fontsize="small")
+        for label, line in self.lines[index].items():
+            line.set_data(*decimate_steps(series.get(label, np.zeros(0)), series.get("time")))
+        axes.relim()
+        axes.autoscale_view()
+
+    def save(self, path: str, used: int = 1) -> None:
+        for axes in self.axes[used:]:
+            axes.set_visible(False)
+        # Fast png compression, the plots are mostly flat colour so files barely grow
+        self.figure.savefig(path, pil_kwargs={"compress_level": 1})
+
+
+_load = None
+_plotter = None
+
+
+def _init_renderer(load: Loader, labels: List[str], xlabel: str, ylabel: str, rows: int, columns: int) -> None:
+    global _load, _plotter
+    _load = load
+    _plotter = StepPlotter(labels, xlabel, ylabel, rows, columns) if rows * columns else None
+
+
+def _render_page(page: Tuple[str, List[str]]) -> None:
+    path, names = page
+    for index, name in enumerate(names):
+        _plotter.draw(index, name, _load(name))
+    _plotter.save(path, len(names))
+
+
+def _decimated(name: str) -> Tuple[str, Dict[str, Tuple[List[int], List[int]]]]:
+    series = _load(name)
+    return name, {label: tuple(values.tolist() for values in decimate_steps(values, series.get("time")))
+                  for label, values in series.items() if label != "time"}
+
+
+def _svg(series: Dict[str, Tuple[List[int], List[int]]], width: int = 320, height: int = 160) -> str:
+    colours = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]
+    top = max((max(y, default=0) for _, y in series.values()), default=0) or 1
+    right = max((max(x, default=0) for x, _ in series.values()), default=0) or 1
+    lines = []
+    for i, (label, (x, y)) in enumerate(series.items()):
+        points = []
+        for j in range(len(x)):
+            if j:
+                points.append((x[j - 1], y[j]))
+            points.append((x[j], y[j]))
+        coordinates = " ".join("{:.1f},{:.1f}".format(px * width / right, height - py * height / top) for px, py in points)
+        lines.append('<polyline fill="none" stroke="{}" points="{}"><title>{}</title></polyline>'.format(
+            colours[i % len(colours)], coordinates, html.escape(label)))
+    return '<svg width="{}" height="{}">{}</svg>'.format(width, height, "".join(lines))
+
+
+# Renders the series of every test into directory, sharing the work out over a pool where each worker keeps
+# one figure. mode is "png" for a plot per test, "grid" for pages of small multiples or "html" for a single page
+# of inline SVG plots.
+def render_reports(names: List[str], load: Loader, labels: List[str], directory: str, number_of_jobs: int = 4,
+                   mode: str = "png", xlabel: str = "Clocks", ylabel: str = "Transactions", per_page: int = 25) -> None:
+    os.makedirs(directory, exist_ok=True)
+    names = list(names)
+    if mode == "png":
+        rows = columns = 1
+        pages = [(os.path.join(directory, name + ".png"), [name]) for name in names]
+    elif mode == "grid":
+        columns = math.ceil(math.sqrt(per_page))
+        rows = math.ceil(per_page / columns)
+        pages = [(os.path.join(directory, "page_{}.png".format(i // per_page)), names[i:i + per_page])
+                 for i in range(0, len(names), per_page)]
+    elif mode == "html":
+        with Pool(number_of_jobs, initializer=_init_renderer, initargs=(load, labels, xlabel, ylabel, 0, 0)) as p:
+            plots = p.map(_decimated, names, chunksize=max(1, len(names) // (4 * number_of_jobs)))
+        with open(os.path.join(directory, "index.html"), 'w') as f:
+            f.write("<html><body>\n")
+            for name, series in plots:
+                f.write('<figure style="display:inline-block"><figcaption>{}</figcaption>{}</figure>\n'.format(
+                    html.escape(name), _svg(series)))
+            f.write("</body></html>\n")
+        return
+    else:
+        raise ValueError("Unknown report mode {}".format(mode))
+
+    with Pool(number_of_jobs, initializer=_init_renderer, initargs=(load, labels, xlabel, ylabel, rows, columns)) as p:
+        for _ in p.imap_unordered(_render_page, pages, chunksize=max(1, len(pages) // (4 * number_of_jobs))):
+            pass
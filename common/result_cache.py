@@ -0,0 +1,131 @@
+import argparse
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from hestia.container import Container
+
+"""
+ Results of finished tests stored on disk under a hash of everything that decides them: the built container
+ with all of its parameters, the clock domains and memories of its model and the model library itself.
+ Entries are evicted least recently used first once the cache grows past max_bytes.
+"""
+class ResultCache:
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.library_hashes = {}
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(os.path.getsize(os.path.join(directory, entry)) for entry in os.listdir(directory))
+
+    def library_hash(self, path: str) -> str:
+        if path not in self.library_hashes:
+            digest = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self.library_hashes[path] = digest.hexdigest()
+        return self.library_hashes[path]
+
+    def key(self, path: str, container: Container, clock_domains: Dict[str, int],
+            memories: Dict[str, Dict[str, int]], extra: Optional[Dict] = None) -> str:
+        description = {
+            "library": self.library_hash(path),
+            "container": describe_container(container),
+            "clock_domains": clock_domains,
+            "memories": memories,
+            "extra": extra,
+        }
+        canonical = json.dumps(description, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        entry = os.path.join(self.directory, key + ".json")
+        try:
+            with open(entry, 'r') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Touch the entry so eviction sees it as recently used
+        os.utime(entry)
+        return result
+
+    def put(self, key: str, result: Dict) -> None:
+        entry = os.path.join(self.directory, key + ".json")
+        if os.path.exists(entry):
+            self.size -= os.path.getsize(entry)
+        with open(entry + ".tmp", 'w') as f:
+            json.dump(result, f)
+        os.replace(entry + ".tmp", entry)
+        self.size += os.path.getsize(entry)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> None:
+        entries = [os.path.join(self.directory, entry) for entry in os.listdir(self.directory)]
+        entries.sort(key=os.path.getmtime)
+        for entry in entries:
+            if self.size <= self.max_bytes * 3 // 4:
+                break
+            self.size -= os.path.getsize(entry)
+            os.remove(entry)
+
+    # Drops a single entry, or everything when no key is given
+    def invalidate(self, key: Optional[str] = None) -> int:
+        if key is not None:
+            entries = [key + ".json"]
+        else:
+            entries = os.listdir(self.directory)
+
+        removed = 0
+        for entry in entries:
+            entry = os.path.join(self.directory, entry)
+            if os.path.exists(entry):
+                self.size -= os.path.getsize(entry)
+                os.remove(entry)
+                removed += 1
+        return removed
+
+
+def describe_parameters(params) -> Dict:
+    # Connection parameters are ctypes structures, so read every declared field
+    description = {}
+    for field in params._fields_:
+        value = getattr(params, field[0])
+        description[field[0]] = value.decode("utf-8") if isinstance(value, bytes) else value
+    return description
+
+
+def describe_container(container: Container) -> Dict:
+    components = {}
+    for key, component in sorted(container.components.items()):
+        components[key] = {
+            "type": type(component).__name__,
+            "parameters": {name: parameter.value for name, parameter in sorted(component.parameters.items())},
+            "internal_connections": {name: describe_parameters(connection.params)
+                                     for name, connection in sorted(getattr(component, "internal_connections", {}).items())},
+        }
+    return {
+        "name": container.name,
+        "type": type(container).__name__,
+        "components": components,
+        "connections": {key: describe_parameters(connection.params) for key, connection in sorted(container.connections.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage an experiment result cache")
+    parser.add_argument("directory", type=str, help="Path to the cache directory")
+    parser.add_argument("command", type=str, choices=["invalidate", "size"], help="What to do with the cache")
+    parser.add_argument("-k", "--key", type=str, default=None, help="Only invalidate this entry")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.directory)
+    if args.command == "invalidate":
+        print("Removed {} entries".format(cache.invalidate(args.key)))
+    else:
+        print("{} bytes".format(cache.size))
+
+if __name__ == "__main__":
+    main()
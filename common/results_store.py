@@ -0,0 +1,221 @@
+import argparse
+import json
+import re
+import socket
+import sqlite3
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from common.streaming_experiment import TestResult
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    experiment TEXT NOT NULL,
+    model TEXT,
+    host TEXT,
+    started REAL NOT NULL,
+    finished REAL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_experiment ON runs (experiment, started);
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    source TEXT NOT NULL,
+    time INTEGER NOT NULL,
+    cycles INTEGER,
+    area INTEGER,
+    wall_time REAL,
+    UNIQUE (run, name)
+);
+CREATE INDEX IF NOT EXISTS tests_time ON tests (run, status, time);
+CREATE INDEX IF NOT EXISTS tests_name ON tests (name);
+CREATE TABLE IF NOT EXISTS counters (
+    test INTEGER NOT NULL REFERENCES tests (id),
+    name TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (test, name)
+) WITHOUT ROWID;
+"""
+
+# Names a sweep parameter cannot take: the other columns of the tests table and those of the runs it is joined with
+_FIXED = {"id", "run", "name", "status", "source", "time", "cycles", "area", "wall_time",
+          "experiment", "model", "host", "started", "finished", "metadata"}
+_TYPES = {bool: "INTEGER", int: "INTEGER", float: "REAL", str: "TEXT"}
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+"""
+ Every test of every run of every experiment in one SQLite database. Each sweep parameter is a typed column of
+ the tests table, named after the parameter and indexed together with the time, so a query like the best time
+ where executor_rate <= 2 is answered from the index instead of by loading every result. Counters of a test
+ are rows of their own table.
+
+ Results are written in batches of batch_size, each batch in one transaction, from the process that collects
+ them. Parameter columns are added the first time a parameter is seen, so experiments with different sweeps
+ share the database; a test leaves the parameters of other experiments NULL.
+"""
+class ResultsStore:
+    def __init__(self, path: str, area: Optional[Callable[[Dict[str, int]], int]] = None, batch_size: int = 256):
+        self.path = path
+        self.area = area
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        # Readers never block the writer and a batch is one fsync at most
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self.parameters = set(self._columns()) - _FIXED
+        self.run = None
+        self.pending = []
+
+    def _columns(self) -> List[str]:
+        return [row["name"] for row in self.connection.execute("PRAGMA table_info(tests)")]
+
+    def start_run(self, experiment: str, model: Optional[str] = None, metadata: Optional[Dict] = None) -> int:
+        cursor = self.connection.execute(
+            "INSERT INTO runs (experiment, model, host, started, metadata) VALUES (?, ?, ?, ?, ?)",
+            (experiment, model, socket.gethostname(), time.time(), json.dumps(metadata or {}, default=str)))
+        self.run = cursor.lastrowid
+        return self.run
+
+    def finish_run(self) -> None:
+        self.flush()
+        if self.run is not None:
+            self.connection.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), self.run))
+
+    def add(self, result: TestResult) -> None:
+        if self.run is None:
+            raise RuntimeError("Start a run before adding results to it")
+        # Take what is written now, the experiment lets go of the counters of a result once it is collected
+        self.pending.append((result.name, result.point, result.status, result.source, result.time, result.cycles,
+                             result.wall_time, result.counters))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def _add_parameters(self, point: Dict) -> None:
+        for parameter, value in point.items():
+            if parameter in self.parameters:
+                continue
+            if not _IDENTIFIER.fullmatch(parameter) or parameter in _FIXED:
+                raise ValueError("Parameter {} cannot be a column of the results store".format(parameter))
+            column_type = _TYPES.get(type(value), "")
+            self.connection.execute("ALTER TABLE tests ADD COLUMN {} {}".format(parameter, column_type))
+            self.connection.execute("CREATE INDEX IF NOT EXISTS tests_{0} ON tests ({0}, time)".format(parameter))
+            self.parameters.add(parameter)
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        try:
+            with self.connection:
+                self.connection.execute("BEGIN IMMEDIATE")
+                self._write(self.pending)
+        except BaseException:
+            # Columns added by the batch were rolled back with it
+            self.parameters = set(self._columns()) - _FIXED
+            raise
+        self.pending = []
+
+    def _write(self, results: List[Tuple]) -> None:
+        for name, point, status, source, clocks, cycles, wall_time, counters in results:
+            self._add_parameters(point)
+            area = self.area(point) if self.area is not None else None
+            columns = ["run", "name", "status", "source", "time", "cycles", "area", "wall_time"] + list(point)
+            values = [self.run, name, status, source, clocks, cycles, area, wall_time] + list(point.values())
+            # A test that is run again within the run replaces the earlier one, counters and all
+            self.connection.execute("DELETE FROM counters WHERE test IN (SELECT id FROM tests WHERE run = ? AND name = ?)",
+                                    (self.run, name))
+            cursor = self.connection.execute("INSERT OR REPLACE INTO tests ({}) VALUES ({})".format(
+                ", ".join(columns), ", ".join("?" * len(values))), values)
+            self.connection.executemany("INSERT INTO counters (test, name, value) VALUES (?, ?, ?)",
+                                        [(cursor.lastrowid, counter, value) for counter, value in counters.items()])
+
+    def close(self) -> None:
+        self.finish_run()
+        self.connection.close()
+
+    def latest_run(self, experiment: str) -> Optional[int]:
+        row = self.connection.execute("SELECT id FROM runs WHERE experiment = ? ORDER BY started DESC LIMIT 1",
+                                      (experiment,)).fetchone()
+        return row["id"] if row is not None else None
+
+    # Tests matching the SQL condition where, over the columns of the tests table and their parameters, with ?
+    # placeholders filled from arguments. Only completed tests of the given experiment or run are considered
+    # when those are set.
+    def query(self, where: str = "", arguments: Sequence = (), experiment: Optional[str] = None,
+              run: Optional[int] = None, order: str = "time", limit: Optional[int] = None,
+              completed: bool = True) -> List[Dict]:
+        conditions = []
+        values = []
+        if experiment is not None:
+            conditions.append("runs.experiment = ?")
+            values.append(experiment)
+        if run is not None:
+            conditions.append("tests.run = ?")
+            values.append(run)
+        if completed:
+            conditions.append("tests.status = 'completed'")
+        if where:
+            conditions.append("({})".format(where))
+            values.extend(arguments)
+
+        sql = "SELECT tests.*, runs.experiment FROM tests JOIN runs ON runs.id = tests.run"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if order:
+            sql += " ORDER BY " + order
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(limit)
+        return [dict(row) for row in self.connection.execute(sql, values)]
+
+    def best(self, where: str = "", arguments: Sequence = (), experiment: Optional[str] = None,
+             run: Optional[int] = None, objective: str = "time") -> Optional[Dict]:
+        rows = self.query(where, arguments, experiment, run, objective, 1)
+        return rows[0] if rows else None
+
+    def counters(self, test: int) -> Dict[str, int]:
+        return {row["name"]: row["value"]
+                for row in self.connection.execute("SELECT name, value FROM counters WHERE test = ?", (test,))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the tests of a results store")
+    parser.add_argument("path", type=str, help="Path to the results database")
+    parser.add_argument("where", type=str, nargs="?", default="",
+                        help="SQL condition over the test columns and parameters, e.g. \"executor_rate <= 2\"")
+    parser.add_argument("-e", "--experiment", type=str, default=None, help="Only tests of this experiment")
+    parser.add_argument("-r", "--run", type=str, default=None,
+                        help="Only tests of this run id, or of the latest run of the experiment with \"latest\"")
+    parser.add_argument("-o", "--order", type=str, default="time", help="SQL ordering of the tests")
+    parser.add_argument("-n", "--limit", type=int, default=10, help="Number of tests to show")
+    parser.add_argument("-c", "--counters", action="store_true", help="Show the counters of every test too")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.path)
+    run = args.run
+    if run == "latest":
+        if args.experiment is None:
+            print("--run latest needs an --experiment")
+            exit(1)
+        run = store.latest_run(args.experiment)
+    elif run is not None:
+        run = int(run)
+
+    for row in store.query(args.where, (), args.experiment, run, args.order, args.limit):
+        parameters = ", ".join("{}={}".format(name, row[name]) for name in sorted(store.parameters)
+                               if row[name] is not None)
+        print("{} run {} {}: time {} area {} ({})".format(row["experiment"], row["run"], row["name"], row["time"],
+                                                          row["area"], parameters))
+        if args.counters:
+            for name, value in sorted(store.counters(row["id"]).items()):
+                print("    {} = {}".format(name, value))
+    store.connection.close()
+
+if __name__ == "__main__":
+    main()
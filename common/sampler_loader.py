@@ -0,0 +1,119 @@
+import fnmatch
+import mmap
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from common.columnar_sampler import MAGIC, read_columnar_header
+
+
+def _map(path: str) -> mmap.mmap:
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _block(data: mmap.mmap, header: Dict, entry: Dict, count: int) -> np.ndarray:
+    if count == 0:
+        return np.zeros(0, dtype=entry["dtype"])
+    return np.frombuffer(data, dtype=entry["dtype"], count=count, offset=header["data_start"] + entry["offset"])
+
+
+def sample_times(header: Dict) -> np.ndarray:
+    if not header.get("time_segments"):
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate([start + step * np.arange(count, dtype=np.int64)
+                           for start, step, count in header["time_segments"]])
+
+
+# Returns the (times, values) of every change of every column of a change sampler file
+def load_changes(path: str) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    header = read_columnar_header(path)
+    if header.get("encoding") != "changes":
+        raise ValueError("{} was not written by a change sampler".format(path))
+
+    data = _map(path)
+    changes = {}
+    for column in header["columns"]:
+        changes[column["name"]] = (_block(data, header, column["times"], column["changes"]),
+                                   _block(data, header, column["values"], column["changes"]))
+    return changes
+
+
+# Rebuilds the value of a change encoded column at each of the given times
+def expand_changes(times: np.ndarray, values: np.ndarray, at: np.ndarray) -> np.ndarray:
+    if times.size == 0:
+        return np.zeros(at.size, dtype=np.int64)
+    # Every column records its value at the first sample, so no time is before the first change
+    return values[np.searchsorted(times, at, side="right") - 1]
+
+
+# Counter names matching a regular expression or a shell style glob, or every name when neither is given
+def select_columns(names: List[str], pattern: Optional[str] = None, glob: Optional[str] = None) -> List[str]:
+    if pattern is not None:
+        compiled = re.compile(pattern)
+        names = [name for name in names if compiled.fullmatch(name)]
+    if glob is not None:
+        names = fnmatch.filter(names, glob)
+    return list(names)
+
+
+# Maps a columnar or change sampler file and returns an array per selected column, including the sample times
+# under "time". Dense files are read without a copy; change encoded files are expanded to one value per cycle
+# from the first sample to the last.
+def load_columnar(path: str, pattern: Optional[str] = None, glob: Optional[str] = None) -> Dict[str, np.ndarray]:
+    header = read_columnar_header(path)
+    data = _map(path)
+    selected = set(select_columns([column["name"] for column in header["columns"]], pattern, glob))
+
+    if header.get("encoding") == "changes":
+        at = sample_times(header)
+        if at.size:
+            at = np.arange(at[0], at[-1] + 1, dtype=np.int64)
+        arrays = {"time": at}
+        for column in header["columns"]:
+            if column["name"] in selected:
+                arrays[column["name"]] = expand_changes(_block(data, header, column["times"], column["changes"]),
+                                                        _block(data, header, column["values"], column["changes"]), at)
+        return arrays
+
+    return {column["name"]: _block(data, header, column, header["rows"]) for column in header["columns"]
+            if column["name"] in selected or column["name"] == "time"}
+
+
+# Parses the selected columns of a csv sampler file straight into integer arrays
+def load_csv(path: str, pattern: Optional[str] = None, glob: Optional[str] = None) -> Dict[str, np.ndarray]:
+    with open(path, 'r') as f:
+        names = [name.strip() for name in f.readline().strip().split(",")]
+        selected = select_columns(names, pattern, glob)
+        if not selected:
+            return {}
+        indices = [names.index(name) for name in selected]
+        table = np.loadtxt(f, delimiter=",", usecols=indices, dtype=np.int64, ndmin=2)
+    return {name: table[:, i] for i, name in enumerate(selected)}
+
+
+# Loads a sampler file of any format, telling them apart by their first bytes
+def load_counters(path: str, pattern: Optional[str] = None, glob: Optional[str] = None) -> Dict[str, np.ndarray]:
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return load_columnar(path, pattern, glob)
+    return load_csv(path, pattern, glob)
+
+
+# The number of samples up to and including the last one where any counter changed
+def active_length(arrays: Dict[str, np.ndarray]) -> int:
+    length = 0
+    for name, values in arrays.items():
+        if name == "time" or values.size == 0:
+            continue
+        changes = np.flatnonzero(values[1:] != values[:-1])
+        length = max(length, int(changes[-1]) + 2 if changes.size else 1)
+    return length
+
+
+# Drops the idle region at the end of a test, where no counter changes any more
+def trim_idle(arrays: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    length = active_length(arrays)
+    return {name: values[:length] for name, values in arrays.items()}
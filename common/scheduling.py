@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+"""
+ How long each test took to simulate in earlier runs, in seconds, keyed by test name
+"""
+class RuntimeHistory:
+    def __init__(self, path: str):
+        self.path = path
+        self.runtimes = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.runtimes = json.load(f)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.runtimes[name] = seconds
+
+    def save(self) -> None:
+        with open(self.path + ".tmp", 'w') as f:
+            json.dump(self.runtimes, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+# Orders points longest first. Points with a recorded runtime use it; the rest use the cheap estimate, scaled
+# to seconds by how the estimate compared with the recorded runtimes of the other points.
+def order_by_cost(points: List[Tuple[str, Dict[str, int]]], estimate: Callable[[Dict[str, int]], float],
+                  history: Optional[RuntimeHistory] = None) -> List[Tuple[str, Dict[str, int]]]:
+    estimates = [estimate(point) for _, point in points]
+    known = [] if history is None else [(history.runtimes[name], cost) for (name, _), cost in zip(points, estimates)
+                                        if name in history.runtimes]
+    scale = 1.0
+    if known and sum(cost for _, cost in known) > 0:
+        scale = sum(seconds for seconds, _ in known) / sum(cost for _, cost in known)
+
+    costs = []
+    for (name, _), cost in zip(points, estimates):
+        if history is not None and name in history.runtimes:
+            costs.append(history.runtimes[name])
+        else:
+            costs.append(cost * scale)
+
+    order = sorted(range(len(points)), key=lambda i: costs[i], reverse=True)
+    return [points[i] for i in order]
+
+
+# Guided self-scheduling: each chunk takes a share of what is left, so chunks shrink as the queue drains. The
+# expensive head goes out in the biggest chunks, but every chunk after it is smaller, so the workers that get
+# the later ones even out the load, and the last points go out one at a time so the run does not end on a
+# straggler.
+def guided_chunks(items: List, number_of_jobs: int, min_chunk: int = 1) -> Iterator[List]:
+    start = 0
+    while start < len(items):
+        size = max(min_chunk, (len(items) - start) // (2 * number_of_jobs))
+        yield items[start:start + size]
+        start += size
+
+
+# Splits points into batches of at most size, keeping the stream lazy
+def batches(points: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for point in points:
+        batch.append(point)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+"""
+ How much of the pool's time was spent simulating, from the busy time each test reports and the wall time
+ of the whole run
+"""
+class PoolUtilisation:
+    def __init__(self, number_of_jobs: int):
+        self.number_of_jobs = number_of_jobs
+        self.start = time.perf_counter()
+        self.end = None
+        self.busy = 0.0
+        self.tests = 0
+
+    def add(self, seconds: float) -> None:
+        self.busy += seconds
+        self.tests += 1
+
+    def stop(self) -> None:
+        self.end = time.perf_counter()
+
+    def wall_time(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def idle_fraction(self) -> float:
+        capacity = self.wall_time() * self.number_of_jobs
+        return max(0.0, 1.0 - self.busy / capacity) if capacity > 0 else 0.0
+
+    def __str__(self) -> str:
+        return "Simulated {} tests in {:.3f}s on {} workers, pool idle {:.1%} of the time".format(
+            self.tests, self.wall_time(), self.number_of_jobs, self.idle_fraction())
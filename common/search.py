@@ -0,0 +1,224 @@
+import math
+import random
+from typing import Dict, List, Optional, Tuple
+
+# Each parameter of a search space maps to the values it can take
+Space = Dict[str, List[int]]
+SearchPoint = Dict[str, int]
+# Scores compare lexicographically, lower is better
+Score = Tuple
+
+
+def point_key(point: SearchPoint) -> Tuple:
+    return tuple(sorted(point.items()))
+
+
+def space_size(space: Space) -> int:
+    size = 1
+    for values in space.values():
+        size *= len(values)
+    return size
+
+
+def decode_point(space: Space, index: int) -> SearchPoint:
+    # Turns an index into the Cartesian product of the space into its point, last parameter varying fastest
+    point = {}
+    for parameter in reversed(list(space)):
+        values = space[parameter]
+        index, value = divmod(index, len(values))
+        point[parameter] = values[value]
+    return {parameter: point[parameter] for parameter in space}
+
+
+"""
+ A strategy that explores a design space with a fixed budget of simulations. Experiments ask it for the
+ next batch of points, run them in parallel and tell it the score of each one until it asks for nothing.
+"""
+class SearchStrategy:
+    def __init__(self, space: Space, budget: int, seed: Optional[int] = None):
+        self.space = space
+        self.budget = budget
+        self.random = random.Random(seed)
+        self.asked = 0
+        self.scores = {}
+        self.best_point = None
+        self.best_score = None
+
+    def remaining(self) -> int:
+        return self.budget - self.asked
+
+    def ask(self) -> List[SearchPoint]:
+        raise NotImplementedError
+
+    def tell(self, point: SearchPoint, score: Score) -> None:
+        self.scores[point_key(point)] = score
+        if self.best_score is None or score < self.best_score:
+            self.best_point = point
+            self.best_score = score
+
+    def _ask(self, points: List[SearchPoint]) -> List[SearchPoint]:
+        points = points[:self.remaining()]
+        self.asked += len(points)
+        return points
+
+    def _sample(self, count: int, exclude: set) -> List[SearchPoint]:
+        # Distinct random points of the space that are not in exclude
+        size = space_size(self.space)
+        count = min(count, size - len(exclude))
+        points = []
+        if size <= 4 * (count + len(exclude)):
+            indices = [i for i in range(size) if point_key(decode_point(self.space, i)) not in exclude]
+            for index in self.random.sample(indices, count):
+                points.append(decode_point(self.space, index))
+            return points
+
+        seen = set(exclude)
+        while len(points) < count:
+            point = decode_point(self.space, self.random.randrange(size))
+            if point_key(point) not in seen:
+                seen.add(point_key(point))
+                points.append(point)
+        return points
+
+
+"""
+ Uniformly random points of the space, without repeats
+"""
+class RandomSearch(SearchStrategy):
+    def ask(self) -> List[SearchPoint]:
+        if self.asked:
+            return []
+        return self._ask(self._sample(self.budget, set()))
+
+
+"""
+ A Latin hypercube over the value indices of every parameter, so each parameter's range is covered evenly
+ even with a small budget. Points that collapse onto each other are topped up with random ones.
+"""
+class LatinHypercubeSearch(SearchStrategy):
+    def ask(self) -> List[SearchPoint]:
+        if self.asked:
+            return []
+        count = min(self.budget, space_size(self.space))
+        strata = {parameter: self.random.sample(range(count), count) for parameter in self.space}
+
+        points = []
+        seen = set()
+        for i in range(count):
+            point = {}
+            for parameter, values in self.space.items():
+                # Strata are spread evenly over the values, so with at least as many points as values each
+                # value is taken by some stratum
+                point[parameter] = values[strata[parameter][i] * len(values) // count]
+            if point_key(point) not in seen:
+                seen.add(point_key(point))
+                points.append(point)
+
+        points.extend(self._sample(count - len(points), seen))
+        return self._ask(points)
+
+
+"""
+ Successive halving: many random points run on a cheap workload, and only the best 1/eta of each rung move
+ on to the next, more expensive, fidelity. fidelities are the values of the fidelity parameter for each
+ rung, ending with the full workload.
+"""
+class SuccessiveHalvingSearch(SearchStrategy):
+    def __init__(self, space: Space, budget: int, fidelity: str, fidelities: List[int], eta: int = 3,
+                 seed: Optional[int] = None):
+        # Each rung sets the fidelity, so only the other parameters are sampled
+        super(SuccessiveHalvingSearch, self).__init__(
+            {parameter: values for parameter, values in space.items() if parameter != fidelity}, budget, seed)
+        self.fidelity = fidelity
+        self.fidelities = fidelities
+        self.eta = eta
+        self.rung = 0
+        self.rung_scores = []
+        # As many starting points as the budget allows once every later rung is paid for
+        self.survivors = None
+        self.initial = max(1, int(budget / sum(eta ** -i for i in range(len(fidelities)))))
+
+    def ask(self) -> List[SearchPoint]:
+        if self.survivors is None:
+            self.survivors = self._sample(self.initial, set())
+        elif self.rung_scores:
+            if self.rung + 1 >= len(self.fidelities):
+                return []
+            self.rung_scores.sort(key=lambda scored: scored[0])
+            keep = max(1, math.ceil(len(self.rung_scores) / self.eta))
+            self.survivors = [point for _, point in self.rung_scores[:keep]]
+            self.rung_scores = []
+            self.rung += 1
+        else:
+            return []
+
+        points = []
+        for survivor in self.survivors:
+            point = dict(survivor)
+            point[self.fidelity] = self.fidelities[self.rung]
+            points.append(point)
+        return self._ask(points)
+
+    def tell(self, point: SearchPoint, score: Score) -> None:
+        design = {parameter: value for parameter, value in point.items() if parameter != self.fidelity}
+        self.rung_scores.append((score, design))
+        self.scores[point_key(point)] = score
+        # Only scores of the full workload are comparable with a normal run
+        if point[self.fidelity] == self.fidelities[-1] and (self.best_score is None or score < self.best_score):
+            self.best_point = point
+            self.best_score = score
+
+
+"""
+ Coordinate descent: starting from a point, try the neighbouring values of one parameter at a time and move
+ whenever a neighbour scores better, until no parameter can be improved or the budget runs out.
+"""
+class CoordinateDescentSearch(SearchStrategy):
+    def __init__(self, space: Space, budget: int, dimensions: Optional[List[str]] = None,
+                 start: Optional[SearchPoint] = None, seed: Optional[int] = None):
+        super(CoordinateDescentSearch, self).__init__(space, budget, seed)
+        self.dimensions = dimensions if dimensions is not None else list(space)
+        self.current = start if start is not None else {parameter: values[len(values) // 2] for parameter, values in space.items()}
+        self.next_dimension = 0
+        # How many dimensions in a row failed to improve the current point
+        self.stale = 0
+        self.candidates = None
+
+    def ask(self) -> List[SearchPoint]:
+        if self.candidates is not None:
+            self._move()
+
+        if point_key(self.current) not in self.scores:
+            return self._ask([self.current])
+
+        while self.stale < len(self.dimensions) and self.remaining() > 0:
+            dimension = self.dimensions[self.next_dimension]
+            self.next_dimension = (self.next_dimension + 1) % len(self.dimensions)
+            self.candidates = self._neighbours(dimension)
+            unseen = [point for point in self.candidates if point_key(point) not in self.scores]
+            if unseen:
+                return self._ask(unseen)
+            self._move()
+        return []
+
+    def _neighbours(self, dimension: str) -> List[SearchPoint]:
+        values = self.space[dimension]
+        index = values.index(self.current[dimension])
+        neighbours = []
+        for neighbour in (index - 1, index + 1):
+            if 0 <= neighbour < len(values):
+                point = dict(self.current)
+                point[dimension] = values[neighbour]
+                neighbours.append(point)
+        return neighbours
+
+    def _move(self) -> None:
+        scored = [point for point in self.candidates if point_key(point) in self.scores]
+        self.candidates = None
+        best = min(scored, key=lambda point: self.scores[point_key(point)], default=None)
+        if best is not None and self.scores[point_key(best)] < self.scores[point_key(self.current)]:
+            self.current = best
+            self.stale = 0
+        else:
+            self.stale += 1
+
@@ -0,0 +1,67 @@
+import os
+import pickle
+import time
+import traceback
+from typing import Callable, Dict
+
+from hestia.model import Model
+
+from common.model_pool import create_model
+
+"""
+ A model created once per worker, with every test run in a forked copy of it. fork() gives each child a
+ copy-on-write view of the process, so the loaded library, the clock domains and the memories are there
+ straight away without being recreated, and nothing a test does can leak into the next one.
+
+ That is all a snapshot shares: components can only be added to a model before setup, and every point of a
+ sweep builds a test of its own, so there is no further state the points have in common to take it after.
+
+ The snapshot quacks like a ModelPool towards run_test: in the child, acquire hands out the model.
+"""
+class ForkSnapshot:
+    def __init__(self, path: str, clock_domains: Dict[str, int], memories: Dict[str, Dict[str, int]]):
+        self.model = create_model(path, clock_domains, memories)
+        # Filled in for the parent once the child is done, as ModelPool does
+        self.last_time = 0.0
+        self.last_reused = True
+
+    def acquire(self) -> Model:
+        return self.model
+
+    def discard(self) -> None:
+        pass
+
+    def release(self) -> None:
+        pass
+
+    # Calls func(*args) in a forked child and returns what it returns, or raises what it raised
+    def run(self, func: Callable, *args):
+        start = time.perf_counter()
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            try:
+                outcome = (True, func(*args))
+            except BaseException as error:
+                outcome = (False, "{}\n{}".format(error, traceback.format_exc()))
+            try:
+                with os.fdopen(write_end, 'wb') as pipe:
+                    pickle.dump(outcome, pipe)
+            finally:
+                # Leave without running the parent's exit handlers, the child is only a copy
+                os._exit(0)
+
+        os.close(write_end)
+        forked = time.perf_counter() - start
+        with os.fdopen(read_end, 'rb') as pipe:
+            data = pipe.read()
+        _, status = os.waitpid(pid, 0)
+        if not data:
+            raise RuntimeError("Forked test died with status {}".format(status))
+
+        succeeded, value = pickle.loads(data)
+        if not succeeded:
+            raise RuntimeError(value)
+        self.last_time = forked
+        return value
@@ -0,0 +1,479 @@
+import os
+import queue
+import time
+from multiprocessing.pool import Pool
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from hestia.container import Container
+from hestia.experiment import Experiment
+from hestia.model import Model
+
+from common.clocking import StopReason, run_until_idle, run_until_pruned
+from common.columnar_sampler import ColumnarSampler
+from common.model_pool import ModelPool, ModelReuseReport, warn_without_reset
+from common.profiling import TickProfiler
+from common.pruning import SharedBest
+from common.scheduling import PoolUtilisation, batches, guided_chunks, order_by_cost
+from common.search import SearchStrategy
+from common.snapshot import ForkSnapshot
+from common.timing import PhaseTimer, TimingTable
+
+if TYPE_CHECKING:
+    from common.broker import Broker
+
+# A sweep point is a test name plus the plain parameter values used to build it
+Point = Tuple[str, Dict[str, int]]
+
+"""
+ The results we keep for a finished test once its model has been released
+"""
+class TestResult:
+    def __init__(self, name: str, point: Dict[str, int], time: int, counters: Dict[str, int]):
+        self.name = name
+        self.point = point
+        self.time = time
+        self.counters = counters
+        # Either "completed", or "pruned" when the run was cut off once it could no longer win. The time of
+        # a pruned test is how far it got, a lower bound of its real time.
+        self.status = "completed"
+        # How long it took to get a model for this test and whether an existing one was reused
+        self.model_time = 0.0
+        self.model_reused = False
+        # Wall time spent on this test inside the worker, in seconds
+        self.wall_time = 0.0
+        # Where the result came from: "simulated", "cache" or "journal"
+        self.source = "simulated"
+        # How many cycles the test was clocked for and the wall and CPU time of each phase of the run, see
+        # PhaseTimer
+        self.cycles = 0
+        self.phases = {}
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "point": self.point, "time": self.time, "counters": self.counters, "status": self.status}
+
+    @staticmethod
+    def from_dict(record: Dict) -> "TestResult":
+        result = TestResult(record["name"], record["point"], record["time"], record["counters"])
+        result.status = record["status"]
+        result.source = "journal"
+        return result
+
+
+"""
+ Everything a worker needs to build a test from a sweep point. Only plain values and functions are
+ stored so the spec can be handed to every worker of the pool once.
+"""
+class ExperimentSpec:
+    def __init__(self, path: str, clock_domains: Dict[str, int], memories: Dict[str, Dict[str, int]],
+                 create_test: Callable[[str, Dict[str, int]], Container], configure_model: Callable[[Model], None], *,
+                 reuse_models: bool = False,
+                 calculate_area: Optional[Callable[[Dict[str, int]], int]] = None, best: Optional[SharedBest] = None,
+                 create_sampler: Optional[Callable[[], Optional[ColumnarSampler]]] = None, profile: int = 0,
+                 fork: bool = False, check_interval: int = 1, tenant_interval: int = 64):
+        self.path = path
+        self.clock_domains = clock_domains
+        self.memories = memories
+        self.create_test = create_test
+        self.configure_model = configure_model
+        self.reuse_models = reuse_models
+        # When both are set, runs are cut off as soon as the best point so far dominates them
+        self.calculate_area = calculate_area
+        self.best = best
+        self.create_sampler = create_sampler
+        # When set, every test is profiled with a TickProfiler stepping this many cycles at a time
+        self.profile = profile
+        # Run every test in a forked copy of a model created once per worker, see ForkSnapshot
+        self.fork = fork
+        # Cycles per call to Model.clock when nothing else sets the step, see run_until_idle for when more
+        # than one is exact
+        self.check_interval = check_interval
+        # Cycles per call to Model.clock when several tests share a model, see run_batch
+        self.tenant_interval = tenant_interval
+
+    def create_model_pool(self) -> ModelPool:
+        return ModelPool(self.path, self.clock_domains, self.memories, self.reuse_models)
+
+
+def _both(first: Callable[[Model], None], second: Callable[[Model], None]) -> Callable[[Model], None]:
+    def call(model: Model) -> None:
+        first(model)
+        second(model)
+    return call
+
+
+def run_test(spec: ExperimentSpec, models: ModelPool, name: str, point: Dict[str, int]) -> TestResult:
+    start = time.perf_counter()
+    # Each test runs in its own directory so samplers do not overwrite each other
+    os.makedirs(name, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(name)
+    timer = PhaseTimer()
+    try:
+        with timer.phase("model"):
+            model = models.acquire()
+        with timer.phase("build"):
+            test = spec.create_test(name, point)
+            test.build(model)
+        with timer.phase("configure"):
+            spec.configure_model(model)
+
+        with timer.phase("validate"):
+            if not model.validate():
+                raise RuntimeError("Test {} is not in a valid state".format(name))
+
+        area = spec.calculate_area(point) if spec.best is not None else None
+        sampler = spec.create_sampler() if spec.create_sampler is not None else None
+        on_step = sampler.sample if sampler is not None else None
+        check_interval = sampler.period if sampler is not None else spec.check_interval
+        profiler = None
+        if spec.profile:
+            # Profiling steps at its own period, unless a sampler already decides how far each step goes
+            profiler = TickProfiler("profile.json", check_interval if sampler is not None else spec.profile, test)
+            check_interval = profiler.period
+            on_step = profiler.sample if sampler is None else _both(sampler.sample, profiler.sample)
+
+        with timer.phase("setup"):
+            model.setup()
+        if profiler is not None:
+            profiler.start(model)
+        with timer.phase("clock"):
+            if area is not None:
+                clocked = run_until_pruned(model, lambda now: spec.best.dominates(now, area), None, check_interval, on_step)
+            else:
+                clocked = run_until_idle(model, None, check_interval, on_step)
+        with timer.phase("tear_down"):
+            model.tear_down()
+            if sampler is not None:
+                sampler.close()
+            if profiler is not None:
+                profiler.close()
+
+        result = TestResult(name, point, model.get_time(), model.get_all_counter_values())
+        if clocked.reason == StopReason.PRUNED:
+            result.status = "pruned"
+        elif area is not None:
+            spec.best.offer(result.time, area)
+        result.cycles = clocked.cycles
+        result.phases = timer.phases
+        result.model_time = models.last_time
+        result.model_reused = models.last_reused
+        result.wall_time = time.perf_counter() - start
+        return result
+    except BaseException:
+        models.discard()
+        raise
+    finally:
+        models.release()
+        os.chdir(cwd)
+
+
+# The spec of the experiment a pool worker is running and its resident model, set once by the pool initializer
+_spec = None
+_models = None
+
+
+def _init_worker(spec: ExperimentSpec) -> None:
+    global _spec, _models
+    _spec = spec
+    _models = ForkSnapshot(spec.path, spec.clock_domains, spec.memories) if spec.fork else spec.create_model_pool()
+
+
+def _run(name: str, point: Dict[str, int]) -> TestResult:
+    if isinstance(_models, ForkSnapshot):
+        result = _models.run(run_test, _spec, _models, name, point)
+        result.model_time = _models.last_time
+        return result
+    return run_test(_spec, _models, name, point)
+
+
+def _run_point(point: Point) -> TestResult:
+    return _run(point[0], point[1])
+
+
+def _run_chunk(points: List[Point]) -> List[TestResult]:
+    return [_run(name, point) for name, point in points]
+
+
+def _run_batch(points: List[Point]) -> List[TestResult]:
+    # multi_tenant builds on this module, so only import it once both are loaded
+    from common.multi_tenant import run_batch
+    if isinstance(_models, ForkSnapshot):
+        results = _models.run(run_batch, _spec, _models, points)
+        for result in results:
+            result.model_time = _models.last_time / len(points)
+        return results
+    return run_batch(_spec, _models, points)
+
+
+def imap_bounded(pool: Pool, func: Callable, items: Iterable, max_pending: int) -> Iterator:
+    # Like Pool.imap_unordered, but never pulls more than max_pending items from the iterable ahead
+    # of the workers, so a generator of sweep points is consumed only as fast as it is simulated.
+    done = queue.Queue()
+    pending = 0
+    for item in items:
+        while pending >= max_pending:
+            pending -= 1
+            yield _unwrap(done.get())
+        pool.apply_async(func, (item,), callback=done.put, error_callback=done.put)
+        pending += 1
+
+    while pending:
+        pending -= 1
+        yield _unwrap(done.get())
+
+
+def _unwrap(result):
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+"""
+ An experiment that generates its sweep points lazily. Points are built just in time inside the worker
+ that runs them and the model is released as soon as its results are collected, so the parent process only
+ ever holds the points in flight and the results.
+"""
+class StreamingExperiment(Experiment):
+    def __init__(self, name: str, path: str):
+        super(StreamingExperiment, self).__init__(name)
+        self.path = path
+        self.clock_domains = {}
+        self.memories = {}
+        # Reset one model per worker between tests, only for model libraries with Model.reset
+        self.reuse_models = False
+        # Profile every test, stepping this many cycles at a time, see TickProfiler
+        self.profile = 0
+        self.fork = False
+        # Opt in to clocking more than one cycle per call, see run_until_idle
+        self.check_interval = 1
+        # How many tests share one model, built side by side and clocked together, see run_batch
+        self.tenants = 1
+        self.tenant_interval = 64
+        self.prune = False
+        self.best = None
+        # A ResultCache to reuse the results of points that were already simulated
+        self.cache = None
+        # A Journal of finished tests, tests it already holds are not run again
+        self.journal = None
+        self.journaled = {}
+        # Run the most expensive points first, estimated with estimate_cost and a RuntimeHistory when given
+        self.schedule = False
+        self.runtimes = None
+        self.utilisation = None
+        # Per phase timings of every simulated test and of the experiment's own steps
+        self.timing = TimingTable()
+        # A ResultAggregator that every collected result is folded into
+        self.aggregator = None
+        # A ResultsStore that every collected result is written to, in the run started on it
+        self.store = None
+        # The outcome of every collected test by name, with its counters only when keep_counters is set
+        self.results = {}
+        self.keep_counters = False
+        self.model_reuse = ModelReuseReport()
+
+    # Yields the (name, parameters) of every point of the sweep
+    def create_points(self) -> Iterator[Point]:
+        raise NotImplementedError
+
+    # Builds the container of a single point. This runs inside a worker, so it must only depend on its arguments
+    @staticmethod
+    def create_test(name: str, point: Dict[str, int]) -> Container:
+        raise NotImplementedError
+
+    # The area of a point, as a static method taking the point. Only experiments that prune need one.
+    calculate_area = None
+
+    # A cheap relative estimate of how long a point takes to simulate, used to schedule the longest first
+    @staticmethod
+    def estimate_cost(point: Dict[str, int]) -> float:
+        return 1.0
+
+    # How good a result is for searches, lower is better
+    def score(self, result: TestResult) -> Tuple:
+        return (result.time if result.status == "completed" else float("inf"),)
+
+    # The test name of a point chosen by a search strategy
+    def point_name(self, point: Dict[str, int]) -> str:
+        return ".".join("{}_{}".format(parameter, value) for parameter, value in point.items())
+
+    # Hook to attach stats and samplers once the test has been built in its model
+    @staticmethod
+    def configure_model(model: Model) -> None:
+        pass
+
+    # Hook to sample counters from Python while the test is clocked, called once per test in its directory
+    @staticmethod
+    def create_sampler() -> Optional[ColumnarSampler]:
+        return None
+
+    def spec(self) -> ExperimentSpec:
+        # Catch a missing hook here, not once in every worker
+        if type(self).create_test is StreamingExperiment.create_test:
+            raise TypeError("{} does not define create_test".format(type(self).__name__))
+        if self.tenants > 1 and (self.prune or self.profile):
+            raise ValueError("Tests sharing a model cannot be pruned or profiled one by one")
+        if self.prune and type(self).calculate_area is None:
+            raise ValueError("Pruning needs the area of every point, {} does not define calculate_area".format(
+                type(self).__name__))
+        if self.reuse_models:
+            warn_without_reset()
+        self.best = SharedBest() if self.prune else None
+        return ExperimentSpec(self.path, self.clock_domains, self.memories, type(self).create_test,
+                              type(self).configure_model, reuse_models=self.reuse_models,
+                              calculate_area=type(self).calculate_area,
+                              best=self.best, create_sampler=type(self).create_sampler, profile=self.profile,
+                              fork=self.fork, check_interval=self.check_interval, tenant_interval=self.tenant_interval)
+
+    def cache_key(self, name: str, point: Dict[str, int]) -> str:
+        return self.cache.key(self.path, type(self).create_test(name, point), self.clock_domains, self.memories,
+                              {"configure_model": type(self).configure_model.__qualname__, "clocking": self._clocking()})
+
+    # Everything that decides how far each call to the model clocks, which the time of a test can depend on
+    def _clocking(self) -> Dict[str, Optional[int]]:
+        sampler = type(self).create_sampler()
+        return {"check_interval": self.check_interval, "profile": self.profile,
+                "sample_period": sampler.period if sampler is not None else None,
+                "tenant_interval": self.tenant_interval if self.tenants > 1 else None}
+
+    def _run_points(self, pool: Optional[Pool], points: Iterable[Point], number_of_jobs: int, max_pending: int,
+                    broker: Optional["Broker"] = None) -> Iterator[TestResult]:
+        # Points that were journaled by an earlier run or have a cached result never reach the pool
+        ready = []
+        keys = {}
+
+        def misses():
+            for name, point in points:
+                if name in self.journaled:
+                    result = self.journaled.pop(name)
+                    self._offer(result)
+                    ready.append(result)
+                    continue
+
+                if self.cache is not None:
+                    key = self.cache_key(name, point)
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        result = TestResult(name, point, cached["time"], cached["counters"])
+                        result.source = "cache"
+                        self._offer(result)
+                        self._journal(result)
+                        ready.append(result)
+                        continue
+                    keys[name] = key
+                yield name, point
+
+        self.utilisation = PoolUtilisation(number_of_jobs)
+        if broker is not None:
+            # Remote workers ask for one point at a time, so scheduled points go out longest first unchunked
+            remaining = order_by_cost(list(misses()), type(self).estimate_cost, self.runtimes) if self.schedule else misses()
+            results = broker.run(self.spec(), remaining)
+        elif self.tenants > 1:
+            batched = imap_bounded(pool, _run_batch, batches(misses(), self.tenants), max_pending)
+            results = (result for batch in batched for result in batch)
+        elif self.schedule:
+            # Longest points first, handed out in shrinking chunks. This needs every point up front, but
+            # only their names and parameters, never their models.
+            ordered = order_by_cost(list(misses()), type(self).estimate_cost, self.runtimes)
+            chunks = imap_bounded(pool, _run_chunk, guided_chunks(ordered, number_of_jobs), max_pending)
+            results = (result for chunk in chunks for result in chunk)
+        else:
+            results = imap_bounded(pool, _run_point, misses(), max_pending)
+
+        for result in results:
+            self.utilisation.add(result.wall_time)
+            if self.runtimes is not None and result.status == "completed":
+                self.runtimes.record(result.name, result.wall_time)
+            while ready:
+                yield ready.pop()
+            if result.name in keys and result.status == "completed":
+                self.cache.put(keys[result.name], {"time": result.time, "counters": result.counters})
+            keys.pop(result.name, None)
+            self._journal(result)
+            yield result
+
+        while ready:
+            yield ready.pop()
+
+        self.utilisation.stop()
+        if self.runtimes is not None:
+            self.runtimes.save()
+
+    def _offer(self, result: TestResult) -> None:
+        if self.best is not None and result.status == "completed":
+            self.best.offer(result.time, type(self).calculate_area(result.point))
+
+    def _journal(self, result: TestResult) -> None:
+        if self.journal is not None:
+            self.journal.append(result.to_dict())
+
+    def _resume(self) -> None:
+        self.journaled = {}
+        if self.journal is not None:
+            for record in self.journal.load():
+                self.journaled[record["name"]] = TestResult.from_dict(record)
+
+    def _close(self) -> None:
+        if self.journal is not None:
+            self.journal.close()
+        if self.store is not None:
+            self.store.flush()
+
+    def _collect(self, result: TestResult) -> None:
+        if self.aggregator is not None:
+            self.aggregator.add(result)
+        if self.store is not None:
+            self.store.add(result)
+        if result.source == "simulated":
+            self.model_reuse.add(result.model_time, result.model_reused)
+            self.timing.add(result.name, result.status, result.cycles, result.wall_time, result.phases)
+        # The aggregator, store and timing table have what they need, so the experiment keeps only the outcome
+        # of each test. The counters would otherwise grow with the sweep.
+        if not self.keep_counters:
+            result.counters = {}
+            result.phases = {}
+        self.results[result.name] = result
+
+    def stream(self, number_of_jobs: int = 1, max_pending: Optional[int] = None) -> Iterator[TestResult]:
+        if max_pending is None:
+            max_pending = 2 * number_of_jobs
+        self._resume()
+        try:
+            with Pool(number_of_jobs, initializer=_init_worker, initargs=(self.spec(),)) as p:
+                yield from self._run_points(p, self.create_points(), number_of_jobs, max_pending)
+        finally:
+            self._close()
+
+    # Runs the points a search strategy picks instead of the whole sweep, feeding each score back to it
+    def search(self, strategy: SearchStrategy, number_of_jobs: int = 1) -> None:
+        # A search scores every point it asks for, and may ask for smaller workloads whose times would cut off
+        # the full runs, so a pruned run has no score to give it
+        if self.prune:
+            raise ValueError("Pruning cuts off the runs a search needs to score")
+        self._resume()
+        try:
+            with Pool(number_of_jobs, initializer=_init_worker, initargs=(self.spec(),)) as p:
+                points = strategy.ask()
+                while points:
+                    named = [(self.point_name(point), point) for point in points]
+                    for result in self._run_points(p, named, number_of_jobs, 2 * number_of_jobs):
+                        self._collect(result)
+                        strategy.tell(result.point, self.score(result))
+                    points = strategy.ask()
+        finally:
+            self._close()
+
+    # Runs the sweep on worker agents that connect to the broker, from this or any other machine. number_of_jobs
+    # is how many workers are expected, used for the utilisation figures only.
+    def distribute(self, broker: "Broker", number_of_jobs: int = 1) -> None:
+        if self.prune:
+            raise ValueError("Pruning shares the best point through memory, it cannot run on remote workers")
+        self._resume()
+        try:
+            for result in self._run_points(None, self.create_points(), number_of_jobs, broker.max_pending, broker):
+                self._collect(result)
+        finally:
+            self._close()
+
+    def run(self, number_of_jobs: int = 1, max_pending: Optional[int] = None) -> None:
+        for result in self.stream(number_of_jobs, max_pending):
+            self._collect(result)
@@ -0,0 +1,57 @@
+from typing import Callable, Dict, Tuple
+
+from hestia.container import Container
+
+"""
+ A container built once per worker and reused for every test with the same topology. Instead of constructing
+ new components, ports and connections for each sweep point, with_params puts back the values the template
+ was built with and applies the point's overrides to the same objects. Overrides are dotted paths:
+
+   "<connection>.<field>"                  a field of a connection's parameters
+   "<component>.<internal>.<field>"        a field of an internal connection of a component
+   "<component>.<parameter>"               a component parameter
+
+ The container returned is the template itself, so it is only good until the next call to with_params.
+ Tests of one worker run one after another, which is all the experiments need.
+"""
+class ContainerTemplate:
+    def __init__(self, create: Callable[[], Container]):
+        self.container = create()
+        if not self.container.validate():
+            raise RuntimeError("Template {} is not in a valid state".format(self.container.name))
+        self.defaults = {}
+        self.resolved = {}
+
+    def _resolve(self, path: str) -> Tuple[object, str, Callable]:
+        if path not in self.resolved:
+            self.resolved[path] = self._find(path)
+        return self.resolved[path]
+
+    def _find(self, path: str) -> Tuple[object, str, Callable]:
+        # The object holding the value, the attribute the value is in and how to convert a new value
+        parts = path.split(".")
+        if len(parts) == 2 and parts[0] in self.container.connections:
+            params = self.container.connections[parts[0]].params
+            return params, parts[1], lambda value: value
+        if len(parts) == 3 and parts[0] in self.container.components:
+            params = self.container.components[parts[0]].internal_connections[parts[1]].params
+            return params, parts[2], lambda value: value
+        if len(parts) == 2 and parts[0] in self.container.components:
+            parameter = self.container.components[parts[0]].parameters[parts[1]]
+            # Parameter values keep the type the component gave them, most are strings
+            return parameter, "value", type(parameter.value)
+        raise KeyError("{} does not name a parameter of {}".format(path, self.container.name))
+
+    def with_params(self, name: str, overrides: Dict[str, object]) -> Container:
+        for path, value in self.defaults.items():
+            holder, attribute, _ = self._resolve(path)
+            setattr(holder, attribute, value)
+
+        for path, value in overrides.items():
+            holder, attribute, convert = self._resolve(path)
+            if path not in self.defaults:
+                self.defaults[path] = getattr(holder, attribute)
+            setattr(holder, attribute, convert(value))
+
+        self.container.name = name
+        return self.container
@@ -0,0 +1,89 @@
+import csv
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+# The phases of a test, in the order they run
+PHASES = ["model", "build", "configure", "validate", "setup", "clock", "tear_down"]
+
+
+"""
+ Wall and CPU time spent in each named phase, in seconds. A phase entered more than once adds up.
+"""
+class PhaseTimer:
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def add(self, name: str, wall: float, cpu: float) -> None:
+        totals = self.phases.setdefault(name, {"wall": 0.0, "cpu": 0.0})
+        totals["wall"] += wall
+        totals["cpu"] += cpu
+
+
+"""
+ The phase timings of every simulated test of an experiment, plus the phases of the experiment itself such as
+ reporting. Results that came from a cache or a journal were not timed and are left out.
+"""
+class TimingTable:
+    def __init__(self):
+        self.tests = {}
+        self.experiment = PhaseTimer()
+
+    def add(self, name: str, status: str, cycles: int, wall_time: float, phases: Dict[str, Dict[str, float]]) -> None:
+        self.tests[name] = {"status": status, "cycles": cycles, "wall_time": wall_time, "phases": phases}
+
+    @staticmethod
+    def cycles_per_second(test: Dict) -> float:
+        clock = test["phases"].get("clock", {"wall": 0.0})["wall"]
+        return test["cycles"] / clock if clock > 0 else 0.0
+
+    def phase_names(self) -> List[str]:
+        names = [phase for phase in PHASES if any(phase in test["phases"] for test in self.tests.values())]
+        names.extend(sorted({phase for test in self.tests.values() for phase in test["phases"]} - set(names)))
+        return names
+
+    # One row per test, with the wall and CPU time of each phase
+    def write(self, path: str) -> None:
+        phases = self.phase_names()
+        with open(path, 'w', newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["test", "status", "cycles", "cycles_per_second", "wall_time"] +
+                            ["{}_{}".format(phase, kind) for phase in phases for kind in ("wall", "cpu")])
+            for name, test in self.tests.items():
+                times = [test["phases"].get(phase, {}).get(kind, 0.0) for phase in phases for kind in ("wall", "cpu")]
+                writer.writerow([name, test["status"], test["cycles"], "{:.1f}".format(self.cycles_per_second(test)),
+                                 "{:.6f}".format(test["wall_time"])] + ["{:.6f}".format(value) for value in times])
+
+    def summary(self, slowest: int = 5) -> str:
+        totals = PhaseTimer()
+        for test in self.tests.values():
+            for phase, spent in test["phases"].items():
+                totals.add(phase, spent["wall"], spent["cpu"])
+        for phase, spent in self.experiment.phases.items():
+            totals.add(phase, spent["wall"], spent["cpu"])
+
+        overall = sum(spent["wall"] for spent in totals.phases.values())
+        lines = ["Time per phase over {} tests:".format(len(self.tests))]
+        phases = self.phase_names()
+        phases.extend(phase for phase in self.experiment.phases if phase not in phases)
+        for phase in phases:
+            spent = totals.phases[phase]
+            lines.append("  {:<10} wall {:9.3f}s  cpu {:9.3f}s  {:6.1%}".format(
+                phase, spent["wall"], spent["cpu"], spent["wall"] / overall if overall > 0 else 0.0))
+
+        lines.append("Slowest tests:")
+        ranked = sorted(self.tests.items(), key=lambda item: item[1]["wall_time"], reverse=True)
+        for name, test in ranked[:slowest]:
+            phase = max(test["phases"], key=lambda phase: test["phases"][phase]["wall"], default="-")
+            lines.append("  {} {:.3f}s, {} cycles at {:.0f} cycles/s, mostly {}".format(
+                name, test["wall_time"], test["cycles"], self.cycles_per_second(test), phase))
+        return "\n".join(lines)
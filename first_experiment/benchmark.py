@@ -0,0 +1,33 @@
+from functools import partial
+from typing import List
+
+from hestia.container import Container
+
+from common.benchmark import BenchmarkCase, benchmark_parser, run_suite
+from first_experiment.containers import NumberTestBench
+
+domain = "clk"
+
+
+def create_number_test_bench(name: str, num_transactions: int) -> Container:
+    test = NumberTestBench(name, domain)
+    test.set_num_transactions(num_transactions)
+    return test
+
+
+def create_cases(transactions: List[int]) -> List[BenchmarkCase]:
+    return [BenchmarkCase("number.transactions_{}".format(num_transactions),
+                          partial(create_number_test_bench, "number.transactions_{}".format(num_transactions), num_transactions),
+                          {domain: 1}, workload={"num_transactions": num_transactions})
+            for num_transactions in transactions]
+
+
+def main():
+    parser = benchmark_parser("Benchmark building, setting up and clocking the number test bench")
+    parser.add_argument("-x", "--transactions", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Numbers the producer sends to the consumer")
+    args = parser.parse_args()
+    run_suite(args, create_cases(args.transactions))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from components import Producer, Consumer
+from first_experiment.components import Producer, Consumer
 
 from hestia.connection import Connection
 from hestia.connection_parameters import ConnectionParameters
@@ -1,19 +1,29 @@
-import csv
 import ctypes
 import os
 import shutil
 from copy import copy
-from multiprocessing.pool import Pool
-from typing import Dict, List
+from typing import Dict, Iterator, Optional
 
-import matplotlib.pyplot as plt
+import numpy as np
 
 from hestia.connection_parameters import ConnectionParameters
-from hestia.experiment import Experiment
+from hestia.container import Container
 from hestia.model import Model
+
+from common.columnar_sampler import ChangeSampler, ColumnarSampler
+from common.rendering import render_reports
+from common.results_store import ResultsStore
+from common.sampler_loader import load_counters, trim_idle
+from common.streaming_experiment import Point, StreamingExperiment
 from first_experiment.containers import NumberTestBench
 
 
+# Cycles between the samples the columnar samplers take from Python. Each sample is a call into the model for
+# every counter, which costs more than clocking a cycle, so sampling every cycle would mostly time the sampler.
+# Test times are rounded up to a multiple of it unless the model library stops clocking once idle.
+SAMPLE_PERIOD = 8
+
+
 class MyExperimentParameters:
     def __init__(self):
         self.num_transactions = 100
@@ -23,79 +33,107 @@ class MyExperimentParameters:
         self.write_rates = [1]
 
 
-class MyExperiment(Experiment):
+class MyExperiment(StreamingExperiment):
+    domain = "clk"
+
     def __init__(self, name: str, path: str, params: MyExperimentParameters = MyExperimentParameters()):
-        super(MyExperiment, self).__init__(name)
-        self.path = path
+        super(MyExperiment, self).__init__(name, path)
         self.params = copy(params)
-        self.domain = "clk"
+        self.clock_domains[self.domain] = 1
 
-        self.create_tests()
-
-    def create_tests(self) -> None:
-        params = ConnectionParameters()
-        params.domain = ctypes.c_char_p(self.domain.encode("utf-8"))
-        params.is_timed = True
+    def create_points(self) -> Iterator[Point]:
         for read_rate in self.params.read_rates:
             for write_rate in self.params.write_rates:
                 for latency in self.params.latencies:
                     for capacity in self.params.capacities:
-                        model = Model(self.path)
-                        model.add_clock_domain(self.domain, 1)
                         test_name = "r_{}.w_{}.l_{}.c_{}".format(read_rate, write_rate, latency, capacity)
+                        yield test_name, {"num_transactions": self.params.num_transactions,
+                                          "read_rate": read_rate,
+                                          "write_rate": write_rate,
+                                          "latency": latency,
+                                          "capacity": capacity}
 
-                        test = NumberTestBench(test_name, self.domain)
-                        test.set_num_transactions(self.params.num_transactions)
-                        params.read_rate = read_rate
-                        params.write_rate = write_rate
-                        params.latency = latency
-                        params.capacity = capacity
-                        test.set_connection_params(params)
-                        test.build(model)
+    @staticmethod
+    def create_test(name: str, point: Dict[str, int]) -> Container:
+        params = ConnectionParameters()
+        params.domain = ctypes.c_char_p(MyExperiment.domain.encode("utf-8"))
+        params.is_timed = True
+        params.read_rate = point["read_rate"]
+        params.write_rate = point["write_rate"]
+        params.latency = point["latency"]
+        params.capacity = point["capacity"]
 
-                        model.attach_basic_stats_to_connections()
+        test = NumberTestBench(name, MyExperiment.domain)
+        test.set_num_transactions(point["num_transactions"])
+        test.set_connection_params(params)
+        return test
 
-                        model.create_csv_sampler("sampler", "counters.csv", 1, "clk")
-                        model.attach_counters_to_sampler("sampler", ".*\.stats\..*")
+    @staticmethod
+    def configure_model(model: Model) -> None:
+        model.attach_basic_stats_to_connections()
 
-                        self.tests[test.name] = model
+        model.create_csv_sampler("sampler", "counters.csv", 1, MyExperiment.domain)
+        model.attach_counters_to_sampler("sampler", r".*\.stats\..*")
 
     @staticmethod
-    def get_data(test: str) -> Dict[str, List[int]]:
-        results = {"production": [], "consumption": []}
-        with open(os.path.join(test, "counters.csv"), 'r') as f:
-            data = csv.DictReader(f)
-            for row in data:
-                for column in row:
-                    if column.endswith("stats.pushed"):
-                        results["production"].append(row[column])
-                    elif column.endswith("stats.popped"):
-                        results["consumption"].append(row[column])
+    def get_data(test: str) -> Dict[str, np.ndarray]:
+        path = os.path.join(test, "counters.bin")
+        if not os.path.exists(path):
+            path = os.path.join(test, "counters.csv")
 
         # Remove idle portion of end of test
-        results["production"] = results["production"][:-10]
-        results["consumption"] = results["consumption"][:-10]
+        counters = trim_idle(load_counters(path, pattern=r".*\.stats\.(pushed|popped)"))
+        results = {"production": np.zeros(0, dtype=np.int64), "consumption": np.zeros(0, dtype=np.int64)}
+        if "time" in counters:
+            results["time"] = counters["time"]
+        for column, values in counters.items():
+            if column.endswith("stats.pushed"):
+                results["production"] = values
+            elif column.endswith("stats.popped"):
+                results["consumption"] = values
         return results
 
     @staticmethod
-    def generate_report(name: str):
+    def report_series(name: str) -> Dict[str, np.ndarray]:
         data = MyExperiment.get_data(name)
-        plt.plot(data["production"], label="Write", drawstyle="steps")
-        plt.plot(data["consumption"], label="Read", drawstyle="steps")
-        plt.xlabel("Clocks")
-        plt.ylabel("Transactions")
-        plt.legend()
-        plt.savefig(os.path.join("results", name + ".png"))
-        plt.clf()
-
-    def generate_reports(self, number_of_jobs: int = 4):
+        series = {"Write": data["production"], "Read": data["consumption"]}
+        if "time" in data:
+            series["time"] = data["time"]
+        return series
+
+    # mode is "png" for a plot per test, "grid" for pages of small multiples or "html" for a single page
+    def generate_reports(self, number_of_jobs: int = 4, mode: str = "png"):
         if os.path.exists("results"):
             shutil.rmtree("results")
-        os.mkdir("results")
-        with Pool(number_of_jobs) as p:
-            p.map(MyExperiment.generate_report, self.tests.keys())
+        render_reports(self.results.keys(), MyExperiment.report_series, ["Write", "Read"], "results",
+                       number_of_jobs, mode)
 
 
+"""
+ The same experiment, sampling counters into a binary columnar file instead of the model's csv sampler
+"""
+class MyColumnarExperiment(MyExperiment):
+    @staticmethod
+    def configure_model(model: Model) -> None:
+        model.attach_basic_stats_to_connections()
+
+    @staticmethod
+    def create_sampler() -> Optional[ColumnarSampler]:
+        return ColumnarSampler("counters.bin", r".*\.stats\..*", SAMPLE_PERIOD)
+
+
+"""
+ The same experiment, only recording each counter when it changes
+"""
+class MyChangeExperiment(MyColumnarExperiment):
+    @staticmethod
+    def create_sampler() -> Optional[ChangeSampler]:
+        return ChangeSampler("counters.bin", r".*\.stats\..*", SAMPLE_PERIOD)
+
+
+# The options stored with the tests of a run, only those that change what the tests simulate or record
+STORED_ARGUMENTS = ["sampler", "check_interval", "tenants"]
+
 
 def run():
     import argparse
@@ -107,8 +145,44 @@ def run():
     parser.add_argument('-d', '--run-directory', type=str, dest='run_directory', action='store',
                         default="_experiment",help='Path to the run directory')
 
+    parser.add_argument('-s', '--sampler', type=str, dest='sampler', action='store', default="csv",
+                        choices=["csv", "columnar", "changes"], help='Format to sample the counters of each test in')
+
+    parser.add_argument('-r', '--report', type=str, dest='report', action='store', default="png",
+                        choices=["png", "grid", "html"],
+                        help='Plot each test to its own png, to pages of small multiples or to a single html page')
+
+    parser.add_argument('--check-interval', type=int, dest='check_interval', action='store', default=1,
+                        help='Cycles per call to the model when clocking. More than 1 is only exact if the model '
+                             'library stops clocking once idle, which tests/test_clocking.py checks')
+
+    parser.add_argument('-n', '--tenants', type=int, dest='tenants', action='store', default=1,
+                        help='Number of tests to build side by side into each model (needs the columnar or changes sampler). '
+                             'Each test then finishes at the sample of its last counter change rather than when the '
+                             'model goes idle')
+
+    parser.add_argument('--reuse-models', dest='reuse_models', action='store_true',
+                        help='Reset one model per worker between tests instead of creating a new one, '
+                             'needs a model library with Model.reset')
+
+    parser.add_argument('--store', type=str, dest='store', action='store', default="_results.db",
+                        help='SQLite database every run adds its tests to, see common/results_store.py')
+
+    parser.add_argument('--no-store', dest='no_store', action='store_true',
+                        help='Do not add the tests of this run to the results database')
+
+    parser.add_argument('-t', '--timing', dest='timing', action='store_true',
+                        help='Print where the time went, per phase and for the slowest tests')
+
     args = parser.parse_args()
 
+    # The csv sampler belongs to the whole model, so it cannot be split between tests sharing one
+    if args.tenants > 1 and args.sampler == "csv":
+        print("--tenants needs the columnar or changes sampler")
+        exit(1)
+
+    store = None if args.no_store else ResultsStore(os.path.abspath(args.store))
+
     if os.path.exists("_tests"):
         shutil.rmtree("_tests")
     os.mkdir("_tests")
@@ -119,9 +193,24 @@ def run():
     params.write_rates = copy(params.read_rates)
     params.latencies = copy(params.read_rates)
     params.capacities = copy(params.read_rates)
-    experiment = MyExperiment("my_experiment", args.model_path, params)
+    experiment_type = {"csv": MyExperiment, "columnar": MyColumnarExperiment, "changes": MyChangeExperiment}[args.sampler]
+    experiment = experiment_type("my_experiment", args.model_path, params)
+    experiment.tenants = args.tenants
+    experiment.check_interval = args.check_interval
+    experiment.reuse_models = args.reuse_models
+    if store is not None:
+        store.start_run("my_experiment", args.model_path, {name: getattr(args, name) for name in STORED_ARGUMENTS})
+        experiment.store = store
     experiment.run(10)
-    experiment.generate_reports()
+    if store is not None:
+        store.close()
+    if args.reuse_models:
+        print(experiment.model_reuse)
+    with experiment.timing.experiment.phase("report"):
+        experiment.generate_reports(mode=args.report)
+    experiment.timing.write(os.path.join("results", "timing.csv"))
+    if args.timing:
+        print(experiment.timing.summary())
     os.chdir("..")
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+from functools import partial
+from typing import List
+
+from hestia.container import Container
+
+from common.benchmark import BenchmarkCase, benchmark_parser, run_suite
+from first_soc.containers import FunctionalTestBench, MemoryBoundTestBench, PerformantTestBench, PipelinedTestBench
+
+domain = "clk"
+memory_name = "mem"
+
+
+def create_pipelined(name: str, num_iterations: int) -> Container:
+    test = PipelinedTestBench(name, domain, memory_name)
+    test.components["application"].set_num_iterations(num_iterations)
+    return test
+
+
+# The benches driven by SimpleApplication only scale with the memory, the pipelined one with its loop too
+def create_cases(iterations: List[int], memory_sizes: List[int]) -> List[BenchmarkCase]:
+    clock_domains = {domain: 1}
+    cases = []
+    for size in memory_sizes:
+        memories = {memory_name: {"discrete": False, "size": size}}
+        for bench, bench_type in [("functional", FunctionalTestBench), ("memory_bound", MemoryBoundTestBench),
+                                  ("performant", PerformantTestBench)]:
+            name = "{}.memory_{}".format(bench, size)
+            cases.append(BenchmarkCase(name, partial(bench_type, name, domain, memory_name), clock_domains, memories,
+                                       {"memory_size": size}))
+        for num_iterations in iterations:
+            name = "pipelined.iterations_{}.memory_{}".format(num_iterations, size)
+            cases.append(BenchmarkCase(name, partial(create_pipelined, name, num_iterations), clock_domains, memories,
+                                       {"memory_size": size, "num_iterations": num_iterations}))
+    return cases
+
+
+def main():
+    parser = benchmark_parser("Benchmark building, setting up and clocking the SoC test benches")
+    parser.add_argument("-i", "--iterations", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Loop iterations of the pipelined test bench's application")
+    parser.add_argument("-m", "--memory-sizes", type=int, nargs="+", dest="memory_sizes", default=[1024, 1024 * 1024],
+                        help="Sizes of the memory every test bench runs with")
+    args = parser.parse_args()
+    run_suite(args, create_cases(args.iterations, args.memory_sizes))
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,11 @@
-from components import FunctionalProcessor, MemoryBoundProcessor, PerformantProcessor, PipelinedProcessor, Memory
-from applications import SimpleApplication
+from first_soc.applications import LoopApplication, SimpleApplication
+from first_soc.components import FunctionalProcessor, MemoryBoundProcessor, PerformantProcessor, PipelinedProcessor, Memory
 from hestia.connection import Connection
 from hestia.connection_parameters import ConnectionParameters
 from hestia.container import Container
 
-# We are going to create a black box container that defines our test bench
-from first_soc.applications import LoopApplication
-
 
+# We are going to create a black box container that defines our test bench
 class FunctionalTestBench(Container):
     def __init__(self, name: str, domain: str, memory_name: str):
         super(FunctionalTestBench, self).__init__(name)
@@ -0,0 +1,138 @@
+import itertools
+import os
+from copy import copy
+from typing import Dict, Iterator, List, Tuple
+
+from hestia.container import Container
+from hestia.model import Model
+
+from common.aggregation import ResultAggregator
+from common.pareto import write_frontier
+from common.templates import ContainerTemplate
+from common.streaming_experiment import Point, StreamingExperiment, TestResult
+from first_soc.containers import PipelinedTestBench
+
+
+class MyExperimentParameters:
+    def __init__(self):
+        self.num_operations_per_iteration = 100
+        self.num_iterations = 100
+        self.instruction_rates = [1,2]
+        self.data_rates = [1,2,3,4,5]
+        self.fetcher_rates = copy(self.data_rates)
+        self.decoder_rates = copy(self.data_rates)
+        self.executor_rates = copy(self.data_rates)
+        self.write_back_rates = copy(self.data_rates)
+
+
+class MyExperiment(StreamingExperiment):
+    domain = "clk"
+    memory_name = "mem"
+    # What the Pareto frontier trades off, "time", "area" or any parameter of the points
+    frontier_objectives = ["time", "area"]
+
+    def __init__(self, name: str, path: str, params: MyExperimentParameters = MyExperimentParameters()):
+        super(MyExperiment, self).__init__(name, path)
+        self.params = copy(params)
+        self.clock_domains[self.domain] = 1
+        self.memories[self.memory_name] = {"discrete": False, "size": 1024}
+        self.aggregator = ResultAggregator(MyExperiment.calculate_area, include=self.is_full_workload)
+
+    def search_space(self) -> Dict[str, List[int]]:
+        return {"instruction_rate": self.params.instruction_rates,
+                "data_rate": self.params.data_rates,
+                "fetcher_rate": self.params.fetcher_rates,
+                "decoder_rate": self.params.decoder_rates,
+                "executor_rate": self.params.executor_rates,
+                "write_back_rate": self.params.write_back_rates,
+                "num_iterations": [self.params.num_iterations]}
+
+    def point_name(self, point: Dict[str, int]) -> str:
+        name = "i_{}.d_{}.f_{}.d_{}.e_{}.w_{}".format(point["instruction_rate"], point["data_rate"], point["fetcher_rate"],
+                                                      point["decoder_rate"], point["executor_rate"], point["write_back_rate"])
+        # Searches may run a point on a smaller workload, keep those apart from the full runs
+        if point["num_iterations"] != self.params.num_iterations:
+            name += ".n_{}".format(point["num_iterations"])
+        return name
+
+    # Points a search ran on a smaller workload are not comparable with the rest
+    def is_full_workload(self, result: TestResult) -> bool:
+        return result.point["num_iterations"] == self.params.num_iterations
+
+    def create_points(self) -> Iterator[Point]:
+        space = self.search_space()
+        for values in itertools.product(*space.values()):
+            point = dict(zip(space, values))
+            yield self.point_name(point), point
+
+    @staticmethod
+    def create_test(name: str, point: Dict[str, int]) -> Container:
+        test = PipelinedTestBench(name, MyExperiment.domain, MyExperiment.memory_name)
+        test.set_instruction_memory_params(rate=point["instruction_rate"], capacity=10, latency=0)
+        test.set_data_memory_params(rate=point["data_rate"], capacity=10, latency=0)
+        test.set_fetcher_params(rate=point["fetcher_rate"], capacity=10, latency=0)
+        test.set_decoder_params(rate=point["decoder_rate"], capacity=10, latency=0)
+        test.set_executor_params(rate=point["executor_rate"], capacity=10, latency=0)
+        test.set_write_back_params(rate=point["write_back_rate"], capacity=10, latency=0)
+        test.components["application"].set_num_iterations(point["num_iterations"])
+        return test
+
+    @staticmethod
+    def calculate_area(point: Dict[str, int]) -> int:
+        return sum(value for parameter, value in point.items() if parameter.endswith("_rate"))
+
+    @staticmethod
+    def estimate_cost(point: Dict[str, int]) -> float:
+        # The slowest stage bounds how fast instructions flow, the other stages add to the latency of each one
+        slowness = [1.0 / value for parameter, value in point.items() if parameter.endswith("_rate")]
+        return point["num_iterations"] * (max(slowness) + sum(slowness) / len(slowness))
+
+    def score(self, result: TestResult) -> Tuple:
+        time = result.time if result.status == "completed" else float("inf")
+        return time, MyExperiment.calculate_area(result.point)
+
+    def generate_report(self):
+        self.aggregator.write(os.path.abspath("results"))
+        names, objectives = self.aggregator.objectives(self.frontier_objectives)
+        write_frontier(os.path.abspath("results"), names, objectives, self.frontier_objectives)
+
+
+"""
+ The same experiment with the basic connection stats attached, which profiling needs to see which connections
+ are busy
+"""
+class MyProfiledExperiment(MyExperiment):
+    @staticmethod
+    def configure_model(model: Model) -> None:
+        model.attach_basic_stats_to_connections()
+
+
+# The connections each rate of a sweep point sets, both ways for the memories
+RATE_CONNECTIONS = {
+    "instruction_rate": ["instruction_request", "instruction_response"],
+    "data_rate": ["data_request", "data_response"],
+    "fetcher_rate": ["processor.fetcher"],
+    "decoder_rate": ["processor.decoder"],
+    "executor_rate": ["processor.executor"],
+    "write_back_rate": ["processor.write_back"],
+}
+
+# Each worker builds the test bench once, see MyTemplateExperiment
+_bench = None
+
+
+"""
+ The same experiment, reusing one test bench per worker and only changing its parameters for each point
+"""
+class MyTemplateExperiment(MyExperiment):
+    @staticmethod
+    def create_test(name: str, point: Dict[str, int]) -> Container:
+        global _bench
+        if _bench is None:
+            _bench = ContainerTemplate(lambda: MyExperiment.create_test("template", point))
+        overrides = {"application.num_iterations": point["num_iterations"]}
+        for rate, connections in RATE_CONNECTIONS.items():
+            for connection in connections:
+                overrides[connection + ".read_rate"] = point[rate]
+                overrides[connection + ".write_rate"] = point[rate]
+        return _bench.with_params(name, overrides)
@@ -1,137 +1,210 @@
 import json
-import operator
 import os
+import secrets
 import shutil
-from copy import copy
-
-from hestia.experiment import Experiment
-from hestia.memory_parameters import MemoryParameters
-from hestia.model import Model
-
-from first_soc.containers import PipelinedTestBench
-
+from multiprocessing import Process
+from typing import Tuple
 
-class MyExperimentParameters:
-    def __init__(self):
-        self.num_operations_per_iteration = 100
-        self.num_iterations = 100
-        self.instruction_rates = [1,2]
-        self.data_rates = [1,2,3,4,5]
-        self.fetcher_rates = copy(self.data_rates)
-        self.decoder_rates = copy(self.data_rates)
-        self.executor_rates = copy(self.data_rates)
-        self.write_back_rates = copy(self.data_rates)
+from common.broker import Broker, parse_address, run_worker
+from common.journal import Journal
+from common.profiling import merge_profiles
+from common.result_cache import ResultCache
+from common.results_store import ResultsStore
+from common.scheduling import RuntimeHistory
+from common.search import CoordinateDescentSearch, LatinHypercubeSearch, RandomSearch, SuccessiveHalvingSearch
+# The experiments live in a module of their own, so worker agents on other machines can unpickle their hooks
+from first_soc.experiments import MyExperiment, MyExperimentParameters, MyProfiledExperiment, MyTemplateExperiment
 
 
-def calculate_area(name: str) -> int:
-    rates = name.split(".")
-    result = 0
-    for rate in rates:
-        result += int(rate.split("_")[-1])
-    return result
+# The options stored with the tests of a run. Anything else, like the authkey of the broker, stays out of the
+# results database.
+STORED_ARGUMENTS = ["prune", "search", "budget", "seed", "schedule", "profile", "templates", "check_interval", "fork",
+                    "broker", "local_workers"]
 
 
-class MyExperiment(Experiment):
-    def __init__(self, name: str, path: str, params: MyExperimentParameters = MyExperimentParameters()):
-        super(MyExperiment, self).__init__(name)
-        self.path = path
-        self.params = copy(params)
-        self.domain = "clk"
+def run_local_worker(address: Tuple[str, int], authkey: bytes, directory: str):
+    os.makedirs(directory, exist_ok=True)
+    os.chdir(directory)
+    run_worker(("localhost", address[1]) if address[0] == "0.0.0.0" else address, authkey)
 
-        self.create_tests()
 
-    def create_tests(self) -> None:
+def run():
+    import argparse
 
-        for instruction_rate in self.params.instruction_rates:
-            for data_rate in self.params.data_rates:
-                for fetcher_rate in self.params.fetcher_rates:
-                    for decoder_rate in self.params.decoder_rates:
-                        for executor_rate in self.params.executor_rates:
-                            for write_back_rates in self.params.write_back_rates:
-                                model = Model(self.path)
-                                model.add_clock_domain(self.domain, 1)
+    parser = argparse.ArgumentParser(description='Process some integers.')
+    parser.add_argument('model_path', type=str,
+                        help='Path to the sandbox model (libsandbox.so)')
 
-                                memory_name = "mem"
-                                memory_params = MemoryParameters()
-                                memory_params.discrete = False
-                                memory_params.size = 1024
+    parser.add_argument('-d', '--run-directory', type=str, dest='run_directory', action='store',
+                        default="_experiment",help='Path to the run directory')
 
-                                model.create_memory(memory_name, memory_params)
+    parser.add_argument('-p', '--prune', dest='prune', action='store_true',
+                        help='Cut off tests as soon as a faster test with no larger area has finished')
 
+    parser.add_argument('-s', '--search', type=str, dest='search', action='store', default=None,
+                        choices=["random", "lhs", "halving", "descent"],
+                        help='Search the design space with a budget instead of running every point')
 
-                                test_name = "i_{}.d_{}.f_{}.d_{}.e_{}.w_{}".format(instruction_rate, data_rate, fetcher_rate, decoder_rate, executor_rate, write_back_rates)
+    parser.add_argument('-b', '--budget', type=int, dest='budget', action='store', default=200,
+                        help='Number of simulations a search may run')
 
-                                test = PipelinedTestBench(test_name, self.domain, memory_name)
-                                test.set_instruction_memory_params(rate=instruction_rate, capacity=10, latency=0)
-                                test.set_data_memory_params(rate=data_rate, capacity=10, latency=0)
-                                test.set_fetcher_params(rate=fetcher_rate, capacity=10, latency=0)
-                                test.set_decoder_params(rate=decoder_rate, capacity=10, latency=0)
-                                test.set_executor_params(rate=executor_rate, capacity=10, latency=0)
-                                test.set_write_back_params(rate=write_back_rates, capacity=10, latency=0)
+    parser.add_argument('--seed', type=int, dest='seed', action='store', default=None,
+                        help='Seed for the random choices of a search')
 
-                                test.build(model)
+    parser.add_argument('-c', '--cache-dir', type=str, dest='cache_dir', action='store', default="_cache",
+                        help='Path to the result cache, reused between runs')
 
-                                self.tests[test.name] = model
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true',
+                        help='Simulate every point even if its result is cached')
 
-    def generate_report(self):
-        if os.path.exists("results"):
-            shutil.rmtree("results")
-        os.mkdir("results")
-        os.chdir("results")
-        test_times = {}
-        for test in self.tests:
-            test_times[test] = self.tests[test].get_time()
+    parser.add_argument('--invalidate-cache', dest='invalidate_cache', action='store_true',
+                        help='Drop every cached result before running')
 
-        with open("top_5.json", 'w') as f:
-            json.dump(dict(sorted(test_times.items(), key=operator.itemgetter(1))[:5]), f)
+    parser.add_argument('-r', '--resume', dest='resume', action='store_true',
+                        help='Keep the tests of an interrupted run and only run the points it did not finish')
 
-        with open("top_10.json", 'w') as f:
-            json.dump(dict(sorted(test_times.items(), key=operator.itemgetter(1))[:10]), f)
+    parser.add_argument('--schedule', dest='schedule', action='store_true',
+                        help='Run the most expensive points first, using the runtimes of earlier runs when known')
 
-        with open("all.json", 'w') as f:
-            json.dump(dict(sorted(test_times.items(), key=operator.itemgetter(1))), f)
+    parser.add_argument('--live-report', type=int, dest='live_report', action='store', default=0,
+                        help='Rewrite the reports after every this many finished tests while the sweep runs')
 
-        winner = {"name": "", "clocks": 0, "area" : 0}
-        for test in test_times:
-            is_winner = False
-            if winner["clocks"] is 0:
-                is_winner = True
-            elif test_times[test] < winner["clocks"]:
-                is_winner = True
-            elif test_times[test] == winner["clocks"] and winner["area"] > calculate_area(test):
-                is_winner = True
+    parser.add_argument('--runtimes', type=str, dest='runtimes', action='store', default="_runtimes.json",
+                        help='Path to the runtimes recorded by earlier runs, used by --schedule')
 
-            if is_winner:
-                winner["name"] = test
-                winner["clocks"] = test_times[test]
-                winner["area"] = calculate_area(test)
+    parser.add_argument('-t', '--timing', dest='timing', action='store_true',
+                        help='Print where the time went, per phase and for the slowest tests')
 
-        with open("winner.json", 'w') as f:
-            json.dump(winner, f)
+    parser.add_argument('--profile', type=int, dest='profile', action='store', default=0,
+                        help='Count how busy every connection of each test is, clocking this many cycles between '
+                             'looks at the connections')
 
-        os.chdir("..")
+    parser.add_argument('--templates', dest='templates', action='store_true',
+                        help='Build the test bench once per worker and only change its parameters for each point')
 
+    parser.add_argument('--check-interval', type=int, dest='check_interval', action='store', default=1,
+                        help='Cycles per call to the model when clocking. More than 1 is only exact if the model '
+                             'library stops clocking once idle, which tests/test_clocking.py checks')
 
-def run():
-    import argparse
+    parser.add_argument('--fork', dest='fork', action='store_true',
+                        help='Run every test in a forked copy of a model created once per worker. Forking costs more '
+                             'per test than it saves unless creating a model is slow')
 
-    parser = argparse.ArgumentParser(description='Process some integers.')
-    parser.add_argument('model_path', type=str,
-                        help='Path to the sandbox model (libsandbox.so)')
+    parser.add_argument('--reuse-models', dest='reuse_models', action='store_true',
+                        help='Reset one model per worker between tests instead of creating a new one, '
+                             'needs a model library with Model.reset')
 
-    parser.add_argument('-d', '--run-directory', type=str, dest='run_directory', action='store',
-                        default="_experiment",help='Path to the run directory')
+    parser.add_argument('--store', type=str, dest='store', action='store', default="_results.db",
+                        help='SQLite database every run adds its tests to, see common/results_store.py')
 
-    args = parser.parse_args()
+    parser.add_argument('--no-store', dest='no_store', action='store_true',
+                        help='Do not add the tests of this run to the results database')
 
-    if os.path.exists("_tests"):
+    parser.add_argument('--broker', type=str, dest='broker', action='store', default=None,
+                        help='Serve the sweep to worker agents on host:port instead of running a local pool. '
+                             'Listens on this machine only unless a host is given. '
+                             'Start workers with: python -m common.broker host:port -k authkey')
+
+    parser.add_argument('--authkey', type=str, dest='authkey', action='store', default=None,
+                        help='Secret the workers must present to the broker, a random one is made and printed if not given')
+
+    parser.add_argument('--local-workers', type=int, dest='local_workers', action='store', default=0,
+                        help='With --broker, also start this many worker agents on this machine')
+
+    args = parser.parse_args()
+    if args.profile and args.templates:
+        print("--profile cannot be combined with --templates")
+        exit(1)
+    if args.prune and args.search is not None:
+        print("--prune cannot be combined with --search")
+        exit(1)
+    # Check before any worker is started, the broker shares neither the best point nor a search's scores
+    if args.broker is not None and (args.prune or args.search is not None):
+        print("--broker cannot be combined with --prune or --search")
+        exit(1)
+
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(os.path.abspath(args.cache_dir))
+        if args.invalidate_cache:
+            cache.invalidate()
+    runtimes_path = os.path.abspath(args.runtimes)
+    store = None if args.no_store else ResultsStore(os.path.abspath(args.store), MyExperiment.calculate_area)
+
+    if os.path.exists("_tests") and not args.resume:
         shutil.rmtree("_tests")
-    os.mkdir("_tests")
+    os.makedirs("_tests", exist_ok=True)
     os.chdir("_tests")
     params = MyExperimentParameters()
-    experiment = MyExperiment("my_experiment", args.model_path, params)
-    experiment.run(4)
-    experiment.generate_report()
+    experiment_type = MyExperiment
+    if args.profile:
+        experiment_type = MyProfiledExperiment
+    elif args.templates:
+        experiment_type = MyTemplateExperiment
+    experiment = experiment_type("my_experiment", args.model_path, params)
+    experiment.profile = args.profile
+    experiment.fork = args.fork
+    experiment.check_interval = args.check_interval
+    experiment.reuse_models = args.reuse_models
+    experiment.prune = args.prune
+    experiment.cache = cache
+    experiment.journal = Journal("journal.jsonl")
+    experiment.schedule = args.schedule
+    experiment.runtimes = RuntimeHistory(runtimes_path)
+    if os.path.exists("results"):
+        shutil.rmtree("results")
+    experiment.aggregator.directory = os.path.abspath("results")
+    experiment.aggregator.every = args.live_report
+    if store is not None:
+        store.start_run("my_experiment", args.model_path, {name: getattr(args, name) for name in STORED_ARGUMENTS})
+        experiment.store = store
+    if args.broker is not None:
+        address = parse_address(args.broker)
+        if args.authkey is None:
+            args.authkey = secrets.token_hex(16)
+            print("Workers connect with: python -m common.broker {} -k {}".format(args.broker, args.authkey))
+        authkey = args.authkey.encode("utf-8")
+        workers = [Process(target=run_local_worker, args=(address, authkey, "_worker_{}".format(i)))
+                   for i in range(args.local_workers)]
+        for worker in workers:
+            worker.start()
+        experiment.distribute(Broker(address, authkey), max(1, args.local_workers))
+        for worker in workers:
+            worker.join()
+    elif args.search is None:
+        experiment.run(4)
+    else:
+        space = experiment.search_space()
+        if args.search == "random":
+            strategy = RandomSearch(space, args.budget, args.seed)
+        elif args.search == "lhs":
+            strategy = LatinHypercubeSearch(space, args.budget, args.seed)
+        elif args.search == "halving":
+            fidelities = [max(1, params.num_iterations // 9), max(1, params.num_iterations // 3), params.num_iterations]
+            strategy = SuccessiveHalvingSearch(space, args.budget, "num_iterations", fidelities, seed=args.seed)
+        else:
+            # Descend over the pipeline stage rates, with the memory rates fixed at the fastest setting
+            start = {parameter: values[len(values) // 2] for parameter, values in space.items()}
+            start["instruction_rate"] = max(params.instruction_rates)
+            start["data_rate"] = max(params.data_rates)
+            strategy = CoordinateDescentSearch(space, args.budget, ["fetcher_rate", "decoder_rate", "executor_rate", "write_back_rate"], start, args.seed)
+        experiment.search(strategy, 4)
+        print("Best of {} simulations: {} {}".format(strategy.asked, strategy.best_point, strategy.best_score))
+    if store is not None:
+        store.close()
+    if args.reuse_models:
+        print(experiment.model_reuse)
+    print(experiment.utilisation)
+    with experiment.timing.experiment.phase("report"):
+        experiment.generate_report()
+    experiment.timing.write(os.path.join("results", "timing.csv"))
+    if args.profile:
+        # Cached and journaled tests were not simulated this time, so only some tests may have a profile
+        profiles = [os.path.join(name, "profile.json") for name in experiment.results]
+        with open(os.path.join("results", "profile.json"), 'w') as f:
+            json.dump(merge_profiles(path for path in profiles if os.path.exists(path)), f, indent=1)
+    if args.timing:
+        print(experiment.timing.summary())
     os.chdir("..")
 
 if __name__ == "__main__":
@@ -1,9 +1,9 @@
-from components import Producer, Consumer
-
 from hestia.connection import Connection
 from hestia.connection_parameters import ConnectionParameters
 from hestia.container import Container
 
+from first_test_bench.components import Producer, Consumer
+
 # We are going to create a black box container that defines our test bench
 class NumberTestBench(Container):
     def __init__(self, name: str, domain: str):
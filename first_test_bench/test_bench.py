@@ -1,9 +1,10 @@
 import argparse
 
-from containers import NumberTestBench
-
 from hestia.model import Model
 
+from common.clocking import run_until_idle
+from first_test_bench.containers import NumberTestBench
+
 def main():
     # User's can provide the path to their test bench library
     parser = argparse.ArgumentParser(description="Run a python test bench")
@@ -32,8 +33,7 @@ def main():
     model.setup()
 
     # Clock the model until no longer busy
-    while model.clock(1):
-        pass
+    run_until_idle(model)
 
     # Tear Down
     model.tear_down()
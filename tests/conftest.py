@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# common and the examples are imported from the root of the repository, as when running the examples
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Tests that simulate need a model library, named by HESTIA_MODEL_PATH
+@pytest.fixture
+def model_path() -> str:
+    path = os.environ.get("HESTIA_MODEL_PATH")
+    if not path:
+        pytest.skip("HESTIA_MODEL_PATH does not name a model library")
+    return path
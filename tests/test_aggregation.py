@@ -0,0 +1,88 @@
+import itertools
+import json
+import operator
+import random
+
+import pytest
+
+pytest.importorskip("hestia")
+pytest.importorskip("numpy")
+
+from common import streaming_experiment
+from common.aggregation import ResultAggregator
+
+FULL_WORKLOAD = 100
+
+
+def area(point):
+    return sum(value for parameter, value in point.items() if parameter.endswith("_rate"))
+
+
+# A fixed set of results: few distinct times so there are ties for the reports to break, a few pruned tests and
+# a few tests a search ran on a smaller workload
+def fixed_results():
+    generator = random.Random(14)
+    results = []
+    for fetcher, executor, iterations in itertools.product([1, 2, 3, 4], [1, 2, 3, 4, 5], [FULL_WORKLOAD, 10]):
+        if iterations != FULL_WORKLOAD and generator.random() < 0.7:
+            continue
+        point = {"fetcher_rate": fetcher, "executor_rate": executor, "num_iterations": iterations}
+        name = "f_{}.e_{}.n_{}".format(fetcher, executor, iterations)
+        result = streaming_experiment.TestResult(name, point, generator.choice([200, 225, 250, 300]), {})
+        if len(results) % 6 == 5:
+            result.status = "pruned"
+        results.append(result)
+    generator.shuffle(results)
+    return results
+
+
+# The reports first_soc wrote before ResultAggregator, by sorting every result once the run was over
+def sorted_reports(results):
+    test_times = {}
+    pruned_times = {}
+    areas = {}
+    for result in results:
+        if result.point["num_iterations"] != FULL_WORKLOAD:
+            continue
+        areas[result.name] = area(result.point)
+        if result.status == "pruned":
+            pruned_times[result.name] = result.time
+        else:
+            test_times[result.name] = result.time
+
+    winner = {"name": "", "clocks": 0, "area": 0}
+    for test in test_times:
+        if winner["clocks"] == 0 or test_times[test] < winner["clocks"] or \
+                (test_times[test] == winner["clocks"] and winner["area"] > areas[test]):
+            winner = {"name": test, "clocks": test_times[test], "area": areas[test]}
+
+    return {"pruned.json": pruned_times,
+            "top_5.json": dict(sorted(test_times.items(), key=operator.itemgetter(1))[:5]),
+            "top_10.json": dict(sorted(test_times.items(), key=operator.itemgetter(1))[:10]),
+            "all.json": dict(sorted(test_times.items(), key=operator.itemgetter(1))),
+            "winner.json": winner}
+
+
+def test_reports_match_sorting_every_result(tmp_path):
+    results = fixed_results()
+    aggregator = ResultAggregator(area, include=lambda result: result.point["num_iterations"] == FULL_WORKLOAD)
+    for result in results:
+        aggregator.add(result)
+    aggregator.write(str(tmp_path))
+
+    for file, expected in sorted_reports(results).items():
+        with open(tmp_path / file) as f:
+            written = json.load(f)
+        # Order matters too, ties are listed in the order the tests finished
+        assert list(written.items()) == list(expected.items()), file
+
+
+def test_live_reports_are_written_every_few_tests(tmp_path):
+    aggregator = ResultAggregator(area, directory=str(tmp_path), every=4)
+    results = fixed_results()
+    for result in results[:3]:
+        aggregator.add(result)
+    assert not (tmp_path / "all.json").exists()
+    aggregator.add(results[3])
+    with open(tmp_path / "tests.json") as f:
+        assert len(json.load(f)) == 4
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("hestia")
+
+from common.benchmark import BENCHMARK_PHASES, compare_reports, missing_from_baseline
+
+
+def report(check_interval: int = 1, **clock_times) -> dict:
+    return {"check_interval": check_interval, "benchmarks": {
+        name: {"cycles": 100, "cycles_per_second": 100 / seconds,
+               "phases": {phase: {"median": seconds if phase == "clock" else 0.0} for phase in BENCHMARK_PHASES}}
+        for name, seconds in clock_times.items()}}
+
+
+def test_slower_clock_is_a_regression():
+    regressions = compare_reports(report(a=0.2), report(a=0.1))
+    assert sorted(regression.measure for regression in regressions) == ["clock", "cycles_per_second"]
+
+
+def test_benchmarks_without_a_baseline_are_reported():
+    assert compare_reports(report(a=0.1, b=0.1), report(a=0.1)) == []
+    assert missing_from_baseline(report(a=0.1, b=0.1), report(a=0.1)) == ["b"]
+
+
+def test_reports_of_different_check_intervals_are_not_compared():
+    with pytest.raises(ValueError):
+        compare_reports(report(1024, a=0.1), report(1, a=0.1))
@@ -0,0 +1,45 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("hestia")
+
+from common.broker import Broker
+from first_soc.experiments import MyExperiment, MyExperimentParameters
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# The worker is a fresh interpreter, not a fork, so it can only run the points if it can import the hooks of
+# the spec by name, as a worker on another machine would
+def test_worker_in_another_process_runs_the_sweep(model_path, tmp_path):
+    params = MyExperimentParameters()
+    params.num_iterations = 2
+    params.instruction_rates = [1]
+    params.data_rates = [1, 2]
+    params.fetcher_rates = params.decoder_rates = params.executor_rates = params.write_back_rates = [1]
+    experiment = MyExperiment("my_experiment", os.path.abspath(model_path), params)
+
+    address = ("127.0.0.1", free_port())
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join([ROOT] + [path for path in [os.environ.get("PYTHONPATH")] if path])
+    worker = subprocess.Popen([sys.executable, "-m", "common.broker", "{}:{}".format(*address), "-k", "secret",
+                               "-d", str(tmp_path)], cwd=ROOT, env=environment,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    try:
+        results = list(Broker(address, b"secret").run(experiment.spec(), experiment.create_points()))
+        output = worker.communicate(timeout=60)[0].decode("utf-8")
+    finally:
+        worker.kill()
+    assert worker.returncode == 0, output
+    assert sorted(result.name for result in results) == sorted(name for name, _ in experiment.create_points())
+    assert all(result.status == "completed" for result in results)
@@ -0,0 +1,96 @@
+import ctypes
+
+import pytest
+
+pytest.importorskip("hestia")
+
+from hestia.connection_parameters import ConnectionParameters
+
+from common.clocking import StopReason, run_until_idle
+from common.model_pool import create_model
+from first_experiment.containers import NumberTestBench
+from first_soc.containers import PipelinedTestBench
+
+domain = "clk"
+memory_name = "mem"
+
+
+"""
+ Just enough of a model to drive the clocking loops: busy until idle_at. A library that does not stop at idle
+ runs every cycle it is asked for.
+"""
+class CountingModel:
+    def __init__(self, idle_at: int, stops_at_idle: bool = True):
+        self.idle_at = idle_at
+        self.stops_at_idle = stops_at_idle
+        self.time = 0
+
+    def clock(self, cycles: int) -> bool:
+        self.time += min(cycles, max(0, self.idle_at - self.time)) if self.stops_at_idle else cycles
+        return self.time < self.idle_at
+
+    def get_time(self) -> int:
+        return self.time
+
+
+@pytest.mark.parametrize("check_interval", [1, 7, 1024])
+def test_stops_at_idle(check_interval):
+    clocked = run_until_idle(CountingModel(1000), None, check_interval)
+    assert (clocked.cycles, clocked.reason) == (1000, StopReason.IDLE)
+
+
+def test_stops_at_max_cycles():
+    clocked = run_until_idle(CountingModel(1000), 10, 1024)
+    assert (clocked.cycles, clocked.reason) == (10, StopReason.MAX_CYCLES)
+
+
+def test_default_is_exact_when_the_library_overruns():
+    assert run_until_idle(CountingModel(1000, stops_at_idle=False)).cycles == 1000
+    assert run_until_idle(CountingModel(1000, stops_at_idle=False), None, 1024).cycles == 1024
+
+
+def run_number_test_bench(model_path: str, check_interval: int, latency: int = 1):
+    model = create_model(model_path, {domain: 1}, {})
+    params = ConnectionParameters()
+    params.domain = ctypes.c_char_p(domain.encode("utf-8"))
+    params.is_timed = True
+    params.latency = latency
+    params.capacity = 5
+
+    test = NumberTestBench("test_bench", domain)
+    test.set_num_transactions(100)
+    test.set_connection_params(params)
+    test.build(model)
+    model.attach_basic_stats_to_connections()
+    assert model.validate()
+    model.setup()
+    run_until_idle(model, None, check_interval)
+    model.tear_down()
+    return model.get_time(), model.get_all_counter_values()
+
+
+def run_pipelined_test_bench(model_path: str, check_interval: int, latency: int = 0):
+    model = create_model(model_path, {domain: 1}, {memory_name: {"discrete": False, "size": 1024}})
+    test = PipelinedTestBench("pipelined_test_bench", domain, memory_name)
+    test.set_instruction_memory_params(latency=latency, capacity=10, rate=1)
+    test.set_data_memory_params(latency=latency, capacity=10, rate=1)
+    test.set_fetcher_params(latency=latency, capacity=10, rate=1)
+    test.set_decoder_params(latency=latency, capacity=10, rate=1)
+    test.set_executor_params(latency=latency, capacity=10, rate=1)
+    test.set_write_back_params(latency=latency, capacity=10, rate=1)
+    test.build(model)
+    model.attach_basic_stats_to_connections()
+    assert model.validate()
+    model.setup()
+    run_until_idle(model, None, check_interval)
+    model.tear_down()
+    return model.get_time(), model.get_all_counter_values()
+
+
+# Batched clocking is only exact if the library's Model.clock(n) stops as soon as the model goes idle, whatever
+# the latency of the connections
+@pytest.mark.parametrize("check_interval", [7, 1024])
+@pytest.mark.parametrize("latency", [0, 1, 2, 5, 10])
+@pytest.mark.parametrize("run", [run_number_test_bench, run_pipelined_test_bench])
+def test_library_stops_clocking_at_idle(model_path, run, latency, check_interval):
+    assert run(model_path, check_interval, latency) == run(model_path, 1, latency)
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+pytest.importorskip("hestia")
+pytest.importorskip("numpy")
+
+from common.columnar_sampler import ChangeSampler, ColumnarSampler
+from common.sampler_loader import load_changes, load_columnar
+
+
+class SteppingModel:
+    def __init__(self):
+        self.time = 0
+
+    def get_time(self) -> int:
+        return self.time
+
+    def get_all_counter_values(self):
+        return {"a.stats.pushed": self.time // 3, "a.stats.popped": -self.time * 1000, "b.other": 1}
+
+
+def sample(path: str, rows: int, chunk_rows: int):
+    sampler = ColumnarSampler(path, r".*\.stats\..*", 1, chunk_rows)
+    model = SteppingModel()
+    for time in range(rows):
+        model.time = time
+        sampler.sample(model)
+    sampler.close()
+    return load_columnar(path)
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 100, 1000])
+def test_spilled_chunks_read_back_like_one_block(tmp_path, chunk_rows):
+    expected = sample(str(tmp_path / "whole.bin"), 100, 1000)
+    actual = sample(str(tmp_path / "chunked.bin"), 100, chunk_rows)
+    assert sorted(actual) == ["a.stats.popped", "a.stats.pushed", "time"]
+    for name, values in expected.items():
+        assert actual[name].dtype == values.dtype
+        assert actual[name].tolist() == values.tolist()
+    assert not os.path.exists(str(tmp_path / "chunked.bin.part"))
+
+
+class SteppedModel(SteppingModel):
+    def get_all_counter_values(self):
+        return {"a.stats.pushed": self.time // 20}
+
+
+# Every change is recorded at the cycle it happened and the series is expanded back to one value per cycle
+def test_change_sampler_expands_to_every_cycle(tmp_path):
+    sampler = ChangeSampler(str(tmp_path / "changes.bin"), ".*", 1)
+    model = SteppedModel()
+    for time in range(300):
+        model.time = time
+        sampler.sample(model)
+    sampler.close()
+
+    times, values = load_changes(str(tmp_path / "changes.bin"))["a.stats.pushed"]
+    assert times.tolist() == list(range(0, 300, 20))
+    arrays = load_columnar(str(tmp_path / "changes.bin"))
+    assert arrays["time"].tolist() == list(range(300))
+    assert arrays["a.stats.pushed"].tolist() == [time // 20 for time in range(300)]
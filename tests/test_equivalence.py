@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip("hestia")
+
+from common.equivalence import diff_counters, shared_counters
+
+
+def test_shared_counters_leave_out_components_only_some_variants_have():
+    functional = {"doorbell.stats.pushed": 1}
+    memory_bound = {"doorbell.stats.pushed": 1, "instruction_request.stats.pushed": 40}
+    assert shared_counters([functional, memory_bound]) == {"doorbell.stats.pushed"}
+
+
+def test_diff_counters_reports_missing_counters():
+    mismatches = diff_counters({"a": 1, "b": 2}, {"a": 1, "c": 3})
+    assert [(m.counter, m.expected, m.actual) for m in mismatches] == [("b", 2, None), ("c", None, 3)]
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip("hestia")
+
+from first_soc.experiments import MyExperiment, MyExperimentParameters
+
+
+def run(model_path: str, fork: bool):
+    params = MyExperimentParameters()
+    params.num_iterations = 5
+    params.instruction_rates = [1]
+    params.data_rates = [1, 3]
+    params.fetcher_rates = params.decoder_rates = [1]
+    params.executor_rates = [1, 4]
+    params.write_back_rates = [2]
+    experiment = MyExperiment("my_experiment", model_path, params)
+    experiment.fork = fork
+    experiment.keep_counters = True
+    experiment.run(2)
+    return {name: (result.status, result.time, result.counters) for name, result in experiment.results.items()}
+
+
+def test_forked_tests_match_tests_run_directly(model_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    direct = run(model_path, False)
+    assert len(direct) == 4
+    assert run(model_path, True) == direct
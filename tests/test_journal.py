@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from common.journal import Journal
+
+
+def write_torn(path, records, partial):
+    with open(path, 'w') as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.write(json.dumps(partial)[:10])
+
+
+def test_partial_last_line_is_dropped(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    write_torn(path, [{"name": "a"}, {"name": "b"}], {"name": "c"})
+    journal = Journal(path)
+    assert journal.load() == [{"name": "a"}, {"name": "b"}]
+
+    # Appends start on a line of their own, so the journal reads back whole
+    journal.append({"name": "c"})
+    journal.close()
+    assert Journal(path).load() == [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+
+
+def test_missing_journal_is_empty(tmp_path):
+    assert Journal(str(tmp_path / "journal.jsonl")).load() == []
+
+
+def run(model_path, journal):
+    from first_soc.experiments import MyExperiment, MyExperimentParameters
+    params = MyExperimentParameters()
+    params.num_iterations = 3
+    params.instruction_rates = [1]
+    params.data_rates = [1, 2, 3]
+    params.fetcher_rates = params.decoder_rates = params.write_back_rates = [1]
+    params.executor_rates = [1, 2]
+    experiment = MyExperiment("my_experiment", model_path, params)
+    experiment.journal = journal
+    experiment.run(2)
+    return experiment.results
+
+
+# Only the tests whose lines made it to the journal whole are kept, the torn one and the rest run again
+def test_resume_reruns_the_points_after_a_torn_line(model_path, tmp_path, monkeypatch):
+    pytest.importorskip("hestia")
+    monkeypatch.chdir(tmp_path)
+    first = run(model_path, Journal("full.jsonl"))
+    records = Journal("full.jsonl").load()
+    assert len(records) == 6
+    write_torn("journal.jsonl", records[:2], records[2])
+
+    resumed = run(model_path, Journal("journal.jsonl"))
+    journaled = {record["name"] for record in records[:2]}
+    assert {name for name, result in resumed.items() if result.source == "journal"} == journaled
+    assert {name for name, result in resumed.items() if result.source == "simulated"} == set(first) - journaled
+    assert {name: result.time for name, result in resumed.items()} == {name: result.time for name, result in first.items()}
+    # The journal now holds every test once, and a further resume runs nothing
+    assert sorted(record["name"] for record in Journal("journal.jsonl").load()) == sorted(first)
+    again = run(model_path, Journal("journal.jsonl"))
+    assert all(result.source == "journal" for result in again.values())
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+pytest.importorskip("hestia")
+pytest.importorskip("numpy")
+
+from hestia.model import Model
+
+from common.columnar_sampler import ColumnarSampler
+from common.sampler_loader import active_length, load_columnar
+from first_experiment.my_experiment import MyColumnarExperiment, MyExperiment, MyExperimentParameters
+
+
+class UnsampledExperiment(MyExperiment):
+    @staticmethod
+    def configure_model(model: Model) -> None:
+        model.attach_basic_stats_to_connections()
+
+
+# Sampled every cycle, so the samples show exactly when each counter last changed
+class DenseExperiment(MyColumnarExperiment):
+    @staticmethod
+    def create_sampler() -> ColumnarSampler:
+        return ColumnarSampler("counters.bin", r".*\.stats\..*", 1)
+
+
+def run(experiment_type: type, model_path: str, tenants: int, tenant_interval: int = 64):
+    params = MyExperimentParameters()
+    params.num_transactions = 20
+    params.read_rates = [1, 3]
+    params.latencies = [1, 5]
+    experiment = experiment_type("my_experiment", model_path, params)
+    experiment.tenants = tenants
+    experiment.tenant_interval = tenant_interval
+    experiment.run(1)
+    return {name: result.time for name, result in experiment.results.items()}
+
+
+# A test sharing a model finishes at its last counter change, which the dense samples of the test run on its
+# own show
+def test_tenants_finish_at_their_last_counter_change(model_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    alone = run(DenseExperiment, model_path, 1)
+    for name in alone:
+        arrays = load_columnar(os.path.join(name, "counters.bin"))
+        alone[name] = int(arrays["time"][active_length(arrays) - 1])
+    assert run(DenseExperiment, model_path, 4) == alone
+
+
+def test_coarse_steps_round_times_up_to_the_step(model_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    exact = run(UnsampledExperiment, model_path, 4, 1)
+    for name, time in run(UnsampledExperiment, model_path, 4, 16).items():
+        assert exact[name] <= time < exact[name] + 16
+
+
+@pytest.mark.parametrize("option", ["prune", "profile"])
+def test_tenants_refuse_options_of_single_tests(model_path, option):
+    experiment = UnsampledExperiment("my_experiment", model_path)
+    experiment.tenants = 2
+    setattr(experiment, option, 1 if option == "profile" else True)
+    with pytest.raises(ValueError, match="sharing a model"):
+        experiment.spec()
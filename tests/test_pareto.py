@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("matplotlib")
+
+from common.pareto import pareto_front, write_frontier
+
+
+# Every pair of points compared, keeping the first of identical points
+def brute_force_front(objectives: np.ndarray) -> np.ndarray:
+    # [i, j] compares point j with point i
+    no_worse = np.all(objectives[None, :, :] <= objectives[:, None, :], axis=2)
+    better = np.any(objectives[None, :, :] < objectives[:, None, :], axis=2)
+    equal = no_worse & ~better
+    dominated = (no_worse & better).any(axis=1)
+    repeated = np.tril(equal, -1).any(axis=1)
+    return np.flatnonzero(~dominated & ~repeated)
+
+
+@pytest.mark.parametrize("dimensions", [1, 2, 3, 4])
+@pytest.mark.parametrize("seed", range(10))
+def test_front_matches_brute_force(dimensions, seed):
+    generator = np.random.default_rng(seed)
+    # Few distinct values make ties and identical points likely
+    objectives = generator.integers(0, 6, size=(int(generator.integers(1, 80)), dimensions))
+    assert pareto_front(objectives).tolist() == brute_force_front(objectives).tolist()
+
+
+@pytest.mark.parametrize("dimensions", [2, 3])
+def test_front_matches_brute_force_across_blocks(dimensions):
+    # More points than one block, on a curve where many of them are on the frontier
+    generator = np.random.default_rng(dimensions)
+    objectives = generator.random((1200, dimensions))
+    objectives[:, -1] = 1 - objectives[:, :-1].sum(axis=1) + 0.05 * objectives[:, -1]
+    assert pareto_front(objectives).tolist() == brute_force_front(objectives).tolist()
+
+
+def test_empty_and_malformed_inputs():
+    assert pareto_front(np.zeros((0, 2))).size == 0
+    with pytest.raises(ValueError):
+        pareto_front(np.zeros(3))
+
+
+def test_write_frontier_lists_the_front_along_the_first_objective(tmp_path):
+    objectives = np.array([[3, 1], [1, 3], [2, 2], [3, 3], [1, 3]])
+    front = write_frontier(str(tmp_path), ["a", "b", "c", "d", "e"], objectives, ["time", "area"])
+    assert front.tolist() == [1, 2, 0]
+    with open(tmp_path / "frontier.json") as f:
+        written = json.load(f)
+    assert written["objectives"] == ["time", "area"]
+    assert written["points"] == [{"name": "b", "time": 1, "area": 3}, {"name": "c", "time": 2, "area": 2},
+                                 {"name": "a", "time": 3, "area": 1}]
+    assert (tmp_path / "frontier.png").stat().st_size > 0
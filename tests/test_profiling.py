@@ -0,0 +1,55 @@
+import pytest
+
+pytest.importorskip("hestia")
+
+from common.profiling import TickProfiler, merge_profiles
+
+
+class CounterModel:
+    def __init__(self):
+        self.time = 0
+        self.counters = {}
+
+    def get_time(self) -> int:
+        return self.time
+
+    def get_all_counter_values(self):
+        return self.counters
+
+    def step(self, cycles: int, **transfers) -> None:
+        self.time += cycles
+        for connection, count in transfers.items():
+            for stat in ("pushed", "popped"):
+                name = "bench.{}.stats.{}".format(connection, stat)
+                self.counters[name] = self.counters.get(name, 0) + count
+
+
+def profile(path: str) -> TickProfiler:
+    model = CounterModel()
+    model.step(0, fetch=0, execute=0)
+    profiler = TickProfiler(path, 4)
+    profiler.prefix = "bench."
+    profiler.start(model)
+    for transfers in ({"fetch": 2}, {"fetch": 1, "execute": 3}, {}, {"execute": 1}):
+        model.step(4, **transfers)
+        profiler.sample(model)
+    return profiler
+
+
+def test_counts_active_cycles_and_transfers(tmp_path):
+    result = profile(str(tmp_path / "profile.json")).profile()
+    assert result["connections"] == {"execute": {"steps": 2, "cycles": 8, "transfers": 8},
+                                     "fetch": {"steps": 2, "cycles": 8, "transfers": 6}}
+    assert result["idle"] == {"steps": 1, "cycles": 4}
+    assert "time" not in result["connections"]["fetch"]
+
+
+def test_merged_profiles_add_up(tmp_path):
+    paths = []
+    for i in range(2):
+        profiler = profile(str(tmp_path / "profile_{}.json".format(i)))
+        profiler.close()
+        paths.append(profiler.path)
+    merged = merge_profiles(paths)
+    assert merged["connections"]["execute"] == {"steps": 4, "cycles": 16, "transfers": 16}
+    assert merged["idle"] == {"steps": 2, "cycles": 8}
@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("hestia")
+
+from common.clocking import StopReason, run_until_pruned
+from common.pruning import SharedBest
+from test_clocking import CountingModel
+
+
+def test_shared_best_keeps_the_fastest_then_smallest():
+    best = SharedBest()
+    assert best.get() is None
+    assert best.offer(100, 5)
+    assert not best.offer(120, 1)
+    assert not best.offer(100, 5)
+    assert best.offer(100, 4)
+    assert best.offer(90, 9)
+    assert best.get() == (90, 9)
+
+
+def test_shared_best_dominates_only_slower_and_no_smaller():
+    best = SharedBest()
+    assert not best.dominates(1000, 1)
+    best.offer(100, 5)
+    assert not best.dominates(100, 5)
+    assert not best.dominates(200, 4)
+    assert best.dominates(101, 5)
+    assert best.dominates(200, 6)
+
+
+def test_run_until_pruned_stops_once_dominated():
+    best = SharedBest()
+    best.offer(100, 5)
+    clocked = run_until_pruned(CountingModel(1000), lambda now: best.dominates(now, 5), None, 10)
+    assert (clocked.cycles, clocked.reason) == (110, StopReason.PRUNED)
+
+
+def test_run_until_pruned_finishes_points_that_win():
+    clocked = run_until_pruned(CountingModel(50), lambda now: False, None, 10)
+    assert (clocked.cycles, clocked.reason) == (50, StopReason.IDLE)
+    clocked = run_until_pruned(CountingModel(1000), lambda now: False, 35, 10)
+    assert (clocked.cycles, clocked.reason) == (35, StopReason.MAX_CYCLES)
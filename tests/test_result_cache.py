@@ -0,0 +1,73 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("hestia")
+
+from common.result_cache import ResultCache
+from first_experiment.my_experiment import MyColumnarExperiment, MyExperiment
+
+
+@pytest.fixture
+def library(tmp_path) -> str:
+    path = str(tmp_path / "library.so")
+    with open(path, 'wb') as f:
+        f.write(b"model library")
+    return path
+
+
+def point(read_rate: int = 1):
+    return {"num_transactions": 10, "read_rate": read_rate, "write_rate": 1, "latency": 1, "capacity": 1}
+
+
+def test_key_is_stable_and_follows_the_container(tmp_path, library):
+    cache = ResultCache(str(tmp_path / "cache"))
+    key = cache.key(library, MyExperiment.create_test("t", point()), {"clk": 1}, {})
+    assert key == ResultCache(str(tmp_path / "cache")).key(library, MyExperiment.create_test("t", point()), {"clk": 1}, {})
+    assert key != cache.key(library, MyExperiment.create_test("t", point(2)), {"clk": 1}, {})
+    assert key != cache.key(library, MyExperiment.create_test("t", point()), {"clk": 2}, {})
+    assert key != cache.key(library, MyExperiment.create_test("t", point()), {"clk": 1}, {}, {"extra": 1})
+
+
+def test_key_follows_how_the_test_is_clocked(tmp_path, library):
+    experiment = MyExperiment("x", library)
+    experiment.cache = ResultCache(str(tmp_path / "cache"))
+    exact = experiment.cache_key("t", point())
+    experiment.check_interval = 1024
+    assert experiment.cache_key("t", point()) != exact
+    experiment.check_interval = 1
+    experiment.tenants = 4
+    assert experiment.cache_key("t", point()) != exact
+    experiment.tenants = 1
+    experiment.profile = 8
+    assert experiment.cache_key("t", point()) != exact
+
+    sampled = MyColumnarExperiment("x", library)
+    sampled.cache = experiment.cache
+    assert sampled.cache_key("t", point()) != exact
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=300)
+    for key in ("a", "b", "c"):
+        cache.put(key, {"time": 1, "counters": {"x": 1}})
+        # Entry times only need to differ for the eviction order
+        os.utime(os.path.join(cache.directory, key + ".json"), (time.time() - 100, time.time() - 100 + ord(key)))
+    assert cache.get("a") is not None
+    for key in ("d", "e", "f", "g", "h", "i", "j"):
+        cache.put(key, {"time": 1, "counters": {"x": 1}, "padding": "." * 10})
+    assert cache.size <= 300
+    assert cache.size == sum(os.path.getsize(os.path.join(cache.directory, entry)) for entry in os.listdir(cache.directory))
+    assert cache.get("b") is None
+    assert cache.get("j") is not None
+
+
+def test_invalidate_one_entry_or_all(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    for key in ("a", "b", "c"):
+        cache.put(key, {"time": 1})
+    assert cache.invalidate("a") == 1
+    assert cache.get("a") is None and cache.get("b") is not None
+    assert cache.invalidate() == 2
+    assert cache.size == 0 and cache.get("b") is None
@@ -0,0 +1,98 @@
+import pytest
+
+pytest.importorskip("hestia")
+
+from common import streaming_experiment
+from common.results_store import ResultsStore
+
+
+def area(point):
+    return sum(value for parameter, value in point.items() if parameter.endswith("_rate"))
+
+
+def result(name, point, time, counters=None, status="completed"):
+    test = streaming_experiment.TestResult(name, point, time, counters or {})
+    test.status = status
+    return test
+
+
+@pytest.fixture
+def store():
+    store = ResultsStore(":memory:", area, batch_size=100)
+    store.start_run("my_experiment", "libsandbox.so", {"prune": False})
+    yield store
+    store.connection.close()
+
+
+def test_parameters_become_typed_indexed_columns(store):
+    store.add(result("a", {"executor_rate": 1, "scale": 0.5, "mode": "fast"}, 100))
+    store.flush()
+    columns = {row["name"]: row["type"] for row in store.connection.execute("PRAGMA table_info(tests)")}
+    assert (columns["executor_rate"], columns["scale"], columns["mode"]) == ("INTEGER", "REAL", "TEXT")
+    indices = {row["name"] for row in store.connection.execute("PRAGMA index_list(tests)")}
+    assert {"tests_executor_rate", "tests_scale", "tests_mode"} <= indices
+    assert store.parameters == {"executor_rate", "scale", "mode"}
+
+    # Another experiment's parameters are added next to them, and left NULL for the first
+    store.add(result("b", {"fetcher_rate": 2}, 90))
+    store.flush()
+    rows = {row["name"]: row for row in store.query()}
+    assert rows["a"]["fetcher_rate"] is None and rows["b"]["executor_rate"] is None
+    assert rows["a"]["area"] == 1 and rows["b"]["area"] == 2
+
+
+@pytest.mark.parametrize("parameter", ["time", "not-a-column"])
+def test_failed_batch_rolls_back_with_its_columns(store, parameter):
+    store.add(result("a", {"executor_rate": 1}, 100))
+    store.add(result("b", {parameter: 1}, 100))
+    with pytest.raises(ValueError):
+        store.flush()
+    assert store.query() == []
+    assert "executor_rate" not in {row["name"] for row in store.connection.execute("PRAGMA table_info(tests)")}
+    assert store.parameters == set()
+
+    # The column the failed batch added is added again by the next one
+    store.pending = []
+    store.add(result("a", {"executor_rate": 1}, 100))
+    store.flush()
+    assert [row["executor_rate"] for row in store.query()] == [1]
+
+
+def test_test_run_again_replaces_the_earlier_one(store):
+    store.add(result("a", {"executor_rate": 1}, 100, {"x": 1, "y": 2}))
+    store.flush()
+    store.add(result("a", {"executor_rate": 1}, 90, {"x": 5}))
+    store.flush()
+    rows = store.query()
+    assert [(row["name"], row["time"]) for row in rows] == [("a", 90)]
+    assert store.counters(rows[0]["id"]) == {"x": 5}
+    assert store.connection.execute("SELECT COUNT(*) FROM counters").fetchone()[0] == 1
+
+
+def test_best_answers_a_condition_on_parameters(store):
+    for rate, time in [(1, 300), (2, 250), (3, 100), (4, 50)]:
+        store.add(result("e_{}".format(rate), {"executor_rate": rate}, time))
+    # Pruned tests only got as far as their time, they are not the best
+    store.add(result("pruned", {"executor_rate": 2}, 10, status="pruned"))
+    store.flush()
+    best = store.best(where="executor_rate <= 2")
+    assert (best["name"], best["time"], best["executor_rate"]) == ("e_2", 250, 2)
+    assert store.best(where="executor_rate <= ?", arguments=(1,))["name"] == "e_1"
+    assert store.best(where="executor_rate > 9") is None
+    assert store.best(objective="area")["name"] == "e_1"
+
+    first = store.run
+    store.start_run("my_experiment")
+    store.add(result("e_1", {"executor_rate": 1}, 40))
+    store.flush()
+    assert store.best(where="executor_rate <= 2")["run"] == store.run
+    assert store.best(where="executor_rate <= 2", run=first)["time"] == 250
+    assert store.latest_run("my_experiment") == store.run
+    assert store.best(experiment="other") is None
+
+
+def test_results_need_a_run():
+    store = ResultsStore(":memory:")
+    with pytest.raises(RuntimeError):
+        store.add(result("a", {}, 1))
+    store.connection.close()
@@ -0,0 +1,16 @@
+from common.scheduling import guided_chunks
+
+
+def test_guided_chunks_shrink_toward_the_tail():
+    items = list(range(6250))
+    sizes = [len(chunk) for chunk in guided_chunks(items, 4)]
+    assert sizes[0] == 6250 // 8
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes[-4:] == [1, 1, 1, 1]
+    assert [item for chunk in guided_chunks(items, 4) for item in chunk] == items
+
+
+def test_guided_chunks_respect_min_chunk():
+    sizes = [len(chunk) for chunk in guided_chunks(list(range(100)), 2, min_chunk=8)]
+    assert sum(sizes) == 100
+    assert all(size >= 8 for size in sizes[:-1])
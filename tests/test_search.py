@@ -0,0 +1,91 @@
+import math
+
+import pytest
+
+from common.search import CoordinateDescentSearch, LatinHypercubeSearch, RandomSearch, SuccessiveHalvingSearch, \
+    point_key
+
+SPACE = {"a": [1, 2, 3, 4], "b": [1, 2, 3, 4, 5, 6, 7], "c": [1, 2]}
+TARGET = {"a": 3, "b": 2, "c": 1}
+
+
+# Convex, with its minimum at TARGET
+def distance(point):
+    return (sum((point[parameter] - TARGET[parameter]) ** 2 for parameter in TARGET),)
+
+
+# Runs a search to the end as an experiment would, returning every point it asked for in order
+def drive(strategy, score=distance):
+    asked = []
+    points = strategy.ask()
+    while points:
+        asked.extend(points)
+        for point in points:
+            strategy.tell(point, score(point))
+        points = strategy.ask()
+    return asked
+
+
+def strategies(budget, seed):
+    fidelities = {"n": [1, 3, 9]}
+    return [RandomSearch(SPACE, budget, seed),
+            LatinHypercubeSearch(SPACE, budget, seed),
+            SuccessiveHalvingSearch(dict(SPACE, **fidelities), budget, "n", fidelities["n"], seed=seed),
+            CoordinateDescentSearch(SPACE, budget, start={"a": 1, "b": 7, "c": 2}, seed=seed)]
+
+
+@pytest.mark.parametrize("budget", [1, 5, 20, 56, 200])
+@pytest.mark.parametrize("seed", range(5))
+def test_budget_is_respected_without_repeats(budget, seed):
+    for strategy in strategies(budget, seed):
+        asked = drive(strategy)
+        assert 0 < len(asked) <= budget
+        assert strategy.asked == len(asked)
+        assert len({point_key(point) for point in asked}) == len(asked), type(strategy).__name__
+
+
+def test_random_search_covers_a_small_space():
+    asked = drive(RandomSearch(SPACE, 1000, 0))
+    assert len(asked) == 4 * 7 * 2
+
+
+@pytest.mark.parametrize("budget", [7, 8, 11, 20, 56])
+@pytest.mark.parametrize("seed", range(10))
+def test_latin_hypercube_covers_every_value_of_each_parameter(budget, seed):
+    asked = drive(LatinHypercubeSearch(SPACE, budget, seed))
+    assert len(asked) == budget
+    for parameter, values in SPACE.items():
+        assert {point[parameter] for point in asked} == set(values)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_halving_promotes_the_best_of_each_rung(seed):
+    fidelities = [1, 3, 9]
+    space = dict(SPACE, n=fidelities)
+    strategy = SuccessiveHalvingSearch(space, 30, "n", fidelities, eta=3, seed=seed)
+    asked = drive(strategy)
+    rungs = [[point for point in asked if point["n"] == fidelity] for fidelity in fidelities]
+    assert len(rungs[0]) == strategy.initial
+    for rung, promoted in zip(rungs, rungs[1:]):
+        best = sorted(rung, key=distance)[:max(1, math.ceil(len(rung) / 3))]
+        design = lambda point: point_key({parameter: value for parameter, value in point.items() if parameter != "n"})
+        assert sorted(map(design, promoted)) == sorted(map(design, best))
+    assert strategy.best_point["n"] == 9
+    assert strategy.best_score == min(distance(point) for point in rungs[-1])
+
+
+@pytest.mark.parametrize("start", [{"a": 1, "b": 7, "c": 2}, {"a": 4, "b": 1, "c": 1}, {"a": 3, "b": 2, "c": 1}])
+def test_descent_converges_on_a_convex_score(start):
+    strategy = CoordinateDescentSearch(SPACE, 100, start=start)
+    asked = drive(strategy)
+    assert strategy.best_point == TARGET
+    assert strategy.current == TARGET
+    # Every move is one step of one parameter, so no more than the walk and the neighbours along it
+    assert len(asked) < 100
+
+
+def test_descent_only_moves_along_its_dimensions():
+    strategy = CoordinateDescentSearch(SPACE, 100, ["a"], {"a": 1, "b": 7, "c": 2})
+    asked = drive(strategy)
+    assert all(point["b"] == 7 and point["c"] == 2 for point in asked)
+    assert strategy.best_point == {"a": 3, "b": 7, "c": 2}
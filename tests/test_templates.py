@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("hestia")
+
+import first_soc.experiments
+from common.result_cache import describe_container
+from common.templates import ContainerTemplate
+from first_soc.experiments import MyExperiment, MyExperimentParameters, MyTemplateExperiment
+
+
+# Each point is checked after points that set other values, so nothing of an earlier point may be left over
+def test_template_matches_a_freshly_built_test(monkeypatch):
+    monkeypatch.setattr(first_soc.experiments, "_bench", None)
+    experiment = MyExperiment("my_experiment", "unused", MyExperimentParameters())
+    points = [point for _, point in experiment.create_points()]
+    for name, point in [("first", points[0]), ("last", points[-1]), ("middle", points[len(points) // 2]),
+                        ("again", points[0]), ("short", dict(points[-1], num_iterations=7))]:
+        expected = describe_container(MyExperiment.create_test(name, point))
+        assert describe_container(MyTemplateExperiment.create_test(name, point)) == expected
+
+
+def test_values_a_point_does_not_override_are_put_back():
+    _, point = next(MyExperiment("my_experiment", "unused").create_points())
+    template = ContainerTemplate(lambda: MyExperiment.create_test("template", point))
+    template.with_params("changed", {"processor.fetcher.read_rate": 5, "application.num_iterations": 3})
+    expected = describe_container(MyExperiment.create_test("plain", point))
+    assert describe_container(template.with_params("plain", {})) == expected
+
+
+def test_unknown_overrides_are_refused():
+    _, point = next(MyExperiment("my_experiment", "unused").create_points())
+    template = ContainerTemplate(lambda: MyExperiment.create_test("template", point))
+    with pytest.raises(KeyError):
+        template.with_params("test", {"processor.nowhere": 1})